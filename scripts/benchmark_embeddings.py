@@ -0,0 +1,55 @@
+"""
+Measures embedding throughput (sentences/second) for each Librarian embedding backend.
+
+Texts are the paragraph chunks of the regulation PDF, repeated to reach --sentences.
+
+Usage:
+    PYTHONPATH=. python3 scripts/benchmark_embeddings.py --sentences 2000 --threads 4
+"""
+
+import argparse
+import time
+import numpy as np
+from pypdf import PdfReader
+from src.tools.embeddings import EMBEDDING_BACKENDS, create_embedding_function
+
+
+def load_texts(pdf_path, n_sentences):
+    chunks = []
+    for page in PdfReader(pdf_path).pages:
+        text = page.extract_text() or ""
+        chunks.extend(p.strip() for p in text.split('\n\n') if len(p.strip()) > 20)
+    return [chunks[i % len(chunks)] for i in range(n_sentences)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding backend throughput benchmark")
+    parser.add_argument("--pdf", default="data/regulations/hazmat_regulations.pdf")
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    texts = load_texts(args.pdf, args.sentences)
+    print(f"Embedding {len(texts)} chunks (threads={args.threads or 'default'})\n")
+
+    reference = None
+    print(f"{'backend':<24}{'sent/s':>10}{'min cos vs fp32':>18}")
+    for backend in EMBEDDING_BACKENDS:
+        try:
+            embedding_fn = create_embedding_function(backend, num_threads=args.threads)
+            embedding_fn(texts[:8])  # warm-up: model load, quantization, thread pools
+            start = time.perf_counter()
+            vectors = np.asarray(embedding_fn(texts), dtype=np.float32)
+            rate = len(texts) / (time.perf_counter() - start)
+        except Exception as e:
+            print(f"{backend:<24}{'skipped':>10}  ({e})")
+            continue
+
+        if reference is None:
+            reference = vectors
+        similarity = float((vectors * reference).sum(axis=1).min())
+        print(f"{backend:<24}{rate:>10.1f}{similarity:>18.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Prints the recall-versus-latency trade-off of the HNSW ef_search setting on our corpus.
+
+Recall is measured against exact brute-force top-k over every stored embedding.
+Pick the smallest ef_search whose recall is acceptable and pass it to
+Librarian(hnsw_config={"ef_search": ...}).
+
+Usage:
+    PYTHONPATH=. python3 scripts/benchmark_hnsw.py --top-k 10
+"""
+
+import argparse
+from src.tools.librarian import Librarian
+
+QUERIES = [
+    "What is the max temperature for Type B(U) packages?",
+    "What is the separation distance for Transport Index 3.0?",
+    "Contamination limits in Bq/cm2 for alpha emitters",
+    "Containment system pressure reduction requirement",
+    "What to do if a package is leaking?",
+    "Fire involving Class 7 radioactive materials",
+    "Classification of hazardous materials",
+    "Scope of the transport regulations",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HNSW ef_search recall/latency report")
+    parser.add_argument("--db-path", default="data/chroma_db")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--ef", type=int, nargs="+", default=[10, 20, 50, 100, 200])
+    args = parser.parse_args()
+
+    lib = Librarian(db_path=args.db_path)
+    print(f"Cold start: {lib.warm_up()}")
+    print(f"Current HNSW settings: {lib.store.hnsw_settings()}\n")
+
+    print(f"{'ef_search':>10}{'recall':>10}{'avg ms':>10}")
+    for row in lib.recall_latency_report(QUERIES, ef_values=args.ef, n_results=args.top_k):
+        print(f"{row['ef_search']:>10}{row['recall']:>10.3f}{row['avg_latency_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measures MessageSigner throughput (signs/second and verifies/second) against the
+previous two-pass path (a throwaway agent card plus a jose.jws.sign of the payload).
+
+The message is a provenance-style decision record with --fields extra fields.
+
+Usage:
+    PYTHONPATH=. python3 scripts/benchmark_signing.py --iterations 20000 --fields 20
+"""
+
+import json
+import time
+import argparse
+from jose import jws
+from jose.constants import ALGORITHMS
+from src.security.interceptor import MessageSigner
+
+
+def make_message(n_fields):
+    message = {
+        "type": "COMPLIANCE_DECISION",
+        "scenario_id": "SCN-BENCH-001",
+        "decision_data": {"compliant": True, "reason": "Ambient temperature within limits"}
+    }
+    message.update({f"field_{i}": f"value-{i}" for i in range(n_fields)})
+    return message
+
+
+def legacy_sign(signer, message):
+    # The pre-single-pass implementation: two serializations, two HMAC signings
+    signer.card_manager.create_agent_card(capabilities=[], description=json.dumps(message))
+    payload = {"iss": signer.card_manager.agent_name, "msg": message}
+    return jws.sign(payload, signer.card_manager.secret, algorithm=ALGORITHMS.HS256)
+
+
+def legacy_verify(signer, token):
+    payload = jws.verify(token, signer.card_manager.secret, algorithms=[ALGORITHMS.HS256])
+    return json.loads(payload)["msg"]
+
+
+def rate(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MessageSigner sign/verify throughput")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--fields", type=int, default=20)
+    args = parser.parse_args()
+
+    signer = MessageSigner("BenchmarkAgent")
+    message = make_message(args.fields)
+    token = signer.sign_message(message)
+    legacy_token = legacy_sign(signer, message)
+    assert signer.verify_message(token) == message
+    assert signer.verify_message(legacy_token) == message
+    assert legacy_verify(signer, token) == message
+
+    rows = [
+        ("sign (legacy)", rate(lambda: legacy_sign(signer, message), args.iterations)),
+        ("sign", rate(lambda: signer.sign_message(message), args.iterations)),
+        ("verify (jose)", rate(lambda: legacy_verify(signer, token), args.iterations)),
+        ("verify", rate(lambda: signer.verify_message(token), args.iterations)),
+    ]
+    print(f"{len(json.dumps(message))} byte message, {args.iterations} iterations\n")
+    print(f"{'operation':<16}{'ops/s':>12}")
+    for name, ops in rows:
+        print(f"{name:<16}{ops:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
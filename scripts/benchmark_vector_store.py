@@ -0,0 +1,97 @@
+"""
+Compares the Chroma and NumPy vector store backends on a synthetic corpus.
+
+Embeddings are random unit vectors so the numbers measure store overhead
+(SQLite, HNSW, matrix products), not transformer inference.
+
+Usage:
+    PYTHONPATH=. python3 scripts/benchmark_vector_store.py --chunks 5000 --queries 200
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+from src.tools.vector_store import create_vector_store
+
+DIM = 384  # all-MiniLM-L6-v2 output size
+
+
+class RandomEmbeddingFunction(EmbeddingFunction):
+    """Deterministic stand-in for the sentence transformer: one fixed vector per text."""
+
+    def __init__(self, vectors_by_text):
+        self.vectors_by_text = vectors_by_text
+
+    def __call__(self, input):
+        return [self.vectors_by_text[text] for text in input]
+
+
+def build_corpus(n_chunks, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n_chunks, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    texts = [f"chunk {i}" for i in range(n_chunks)]
+    return texts, vectors
+
+
+def run_backend(backend, dtype, texts, vectors, queries, n_results):
+    db_path = tempfile.mkdtemp(prefix=f"bench_{backend}_")
+    try:
+        embedding_fn = RandomEmbeddingFunction(dict(zip(texts, vectors.tolist())))
+        store = create_vector_store(backend, db_path, embedding_fn, collection_name="bench", dtype=dtype)
+
+        start = time.perf_counter()
+        batch = 5000  # Chroma rejects very large single adds
+        for i in range(0, len(texts), batch):
+            store.add(
+                documents=texts[i:i + batch],
+                metadatas=[{"i": j} for j in range(i, min(i + batch, len(texts)))],
+                ids=texts[i:i + batch]
+            )
+        ingest_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        single_ids = [store.query(query_embeddings=[q.tolist()], n_results=n_results)["ids"][0] for q in queries]
+        single_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        start = time.perf_counter()
+        store.query(query_embeddings=queries.tolist(), n_results=n_results)
+        batch_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        return {"ingest_s": ingest_s, "single_ms": single_ms, "batch_ms": batch_ms, "ids": single_ids}
+    finally:
+        shutil.rmtree(db_path, ignore_errors=True)
+
+
+def recall(found, exact):
+    hits = sum(len(set(f) & set(e)) for f, e in zip(found, exact))
+    return hits / sum(len(e) for e in exact)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector store backend benchmark")
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    texts, vectors = build_corpus(args.chunks)
+    queries = build_corpus(args.queries, seed=1)[1]
+
+    # Exact top-k, used as ground truth for recall
+    exact = [[texts[i] for i in np.argsort(-(vectors @ q))[:args.top_k]] for q in queries]
+
+    print(f"Corpus: {args.chunks} chunks x {DIM} dims, {args.queries} queries, top-{args.top_k}\n")
+    print(f"{'backend':<16}{'ingest s':>10}{'query ms':>10}{'batched ms':>12}{'recall':>8}")
+    for backend, dtype in [("chroma", "float32"), ("numpy", "float32"), ("numpy", "float16"), ("numpy", "int8")]:
+        stats = run_backend(backend, dtype, texts, vectors, queries, args.top_k)
+        label = backend if backend == "chroma" else f"numpy/{dtype}"
+        print(f"{label:<16}{stats['ingest_s']:>10.2f}{stats['single_ms']:>10.3f}"
+              f"{stats['batch_ms']:>12.3f}{recall(stats['ids'], exact):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Regression checks for PolicyValidator: policies that could exhaust CPU or memory
+in-process must be rejected, and the agent's own policies must still verify.
+
+Usage:
+    PYTHONPATH=. python3 scripts/test_policy_validator.py
+"""
+
+from src.sandbox.executor import SandboxExecutor
+from src.agents.compliance_agent import MOCK_POLICY, UNAVAILABLE_POLICY
+
+REJECTED = {
+    "string repeated by a power": "s = 'a'\nr = s * 10**10",
+    "str() repeated by a power": "r = str(scenario) * 10**12",
+    "list repeated by a power": "r = list(range(10)) * 10**12",
+    "list repeated by a large int": "r = list(range(10)) * 1000000000000",
+    "augmented repetition": "s = str(scenario)\ns *= 10**12",
+    "recursive function": "def f(n):\n    return f(n) + f(n)\nresult = f(1)",
+    "recursive lambda": "f = lambda n: f(n) + f(n)\nresult = f(1)",
+    "loop appending to its iterable": "l = [1]\nfor x in l:\n    l.append(x)",
+    "loop extending its iterable": "l = [1]\nfor x in l:\n    l += [x]",
+    "comprehension appending to its iterable": "l = [1]\nr = [l.append(x) for x in l]",
+}
+
+VERIFIED = {
+    "MOCK_POLICY": MOCK_POLICY,
+    "UNAVAILABLE_POLICY": UNAVAILABLE_POLICY,
+    "unit conversion": "activity_bq = scenario.get('activity_tbq', 0) * 1e12\nresult = activity_bq < 4 * 10000",
+    "loop appending to another list": "items = []\nfor x in scenario.get('items', []):\n    items.append(x)",
+}
+
+
+def test_policy_validator():
+    validator = SandboxExecutor(verify=True).validator
+    failures = 0
+
+    for name, source in REJECTED.items():
+        violation = validator.check(source)
+        if violation:
+            print(f"✅ Rejected {name}: {violation}")
+        else:
+            print(f"❌ Verified {name}")
+            failures += 1
+
+    for name, source in VERIFIED.items():
+        violation = validator.check(source)
+        if violation is None:
+            print(f"✅ Verified {name}")
+        else:
+            print(f"❌ Rejected {name}: {violation}")
+            failures += 1
+
+    assert failures == 0, f"{failures} validator check(s) failed"
+
+
+if __name__ == "__main__":
+    test_policy_validator()
@@ -1,16 +1,75 @@
 import os
 import json
+import time
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
 from dotenv import load_dotenv
 from src.tools.librarian import Librarian
+from src.tools.rule_engine import RuleEngine
+from src.tools.context_builder import ContextBuilder
 from src.sandbox.executor import SandboxExecutor
 from src.security.agent_card import AgentCardManager
+from src.utils.policy_cache import PolicyCache
+from src.utils.llm_cache import CachedGenerativeModel, resolve_cache_mode
+from src.utils.rate_limiter import AsyncTokenBucket
+from src.utils.singleflight import SingleFlight
+from src.utils.model_router import ModelRouter
+from src.utils.decision_cache import DecisionCache
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.utils.policy_stream import PolicyStream, END_MARKER
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Bump whenever the policy-generation prompt changes; cached policies from
+# other prompt versions are invalidated.
+PROMPT_VERSION = "5"
+
+# Deterministic stand-in for LLM policy generation in MOCK MODE
+MOCK_POLICY = """temp = scenario.get("ambient_temperature_c", 0)
+if temp > 38:
+    result = False
+    reason = 'Ambient temperature > 38C'
+else:
+    result = True
+    reason = 'Ambient temperature within limits'"""
+
+# The only scenario field MOCK_POLICY checks; as an outage fallback it may only decide
+# scenarios that carry it
+MOCK_POLICY_FIELD = "ambient_temperature_c"
+
+# Outage fallback for everything else: fail safe, so the scenario goes to human review
+UNAVAILABLE_POLICY = """result = False
+reason = 'Compliance policy unavailable (LLM path down); needs human review'"""
+
+# Coalesces identical in-flight prompts. Module-level so agents created per request
+# (src/web/app.py) share in-flight calls within the process.
+LLM_SINGLEFLIGHT = SingleFlight()
+
+# Guards policy generation: opens when Gemini's error rate or p95 latency breaches the
+# SLO, after which policies come from the policy cache or MOCK_POLICY until a probe
+# succeeds. Shared process-wide for the same reason as LLM_SINGLEFLIGHT.
+LLM_CIRCUIT_BREAKER = CircuitBreaker("gemini", window=50, min_calls=10, max_error_rate=0.5,
+                                     latency_slo_ms=10000, latency_percentile=95, cooldown_s=30)
+
+# Scenarios buffered per window by check_scenarios; bounds memory for huge manifests
+BATCH_WINDOW = 256
+
+def _plain(value):
+    # NumPy scalars from a vectorized batch (e.g. numpy.bool_) -> Python values for JSON
+    return value.item() if hasattr(value, "item") else value
+
 class HazardComplianceAgent:
-    def __init__(self, model_name="gemini-2.0-flash-exp"):
+    def __init__(self, model_name="gemini-2.0-flash-exp", policy_cache_path="data/policy_cache.json",
+                 llm_cache_mode=None, max_concurrent_llm_calls=8, llm_requests_per_minute=60,
+                 retrieval_workers=4, rules_dir="config/rules", use_rule_engine=True,
+                 context_token_budget=1024, retrieval_candidates=8,
+                 fast_model_name="gemini-2.0-flash-lite", difficulty_threshold=0.5,
+                 decision_cache_dir="data/decision_cache", decision_ttl_s=3600, memoize_decisions=True,
+                 circuit_breaker=None, stream_llm=False, isolated_sandbox=False, verify_policies=False,
+                 instrument_sandbox=False):
         self.agent_name = "HazardComplianceAgent"
         self.card_manager = AgentCardManager(self.agent_name)
         self.agent_card = self.card_manager.create_agent_card(
@@ -19,51 +78,78 @@ class HazardComplianceAgent:
         )
         
         self.librarian = Librarian()
-        self.executor = SandboxExecutor()
+        # Retrieve a wider candidate set, then de-duplicate, rerank and cut it to the token budget
+        self.retrieval_candidates = retrieval_candidates
+        self.context_builder = ContextBuilder(token_budget=context_token_budget)
+        # isolated_sandbox: run generated policies in warm worker processes with CPU,
+        # memory and wall-clock limits instead of in-process exec.
+        # verify_policies: statically verify each policy once; verified policies run
+        # in-process and only unverified ones pay for the worker processes.
+        # instrument_sandbox: per-run resource metrics and per-policy histograms (executor.metrics)
+        self.executor = SandboxExecutor(isolated=isolated_sandbox, verify=verify_policies,
+                                        instrument=instrument_sandbox)
+        self.model_name = model_name
+        self.policy_cache = PolicyCache(PROMPT_VERSION, cache_path=policy_cache_path)
+        # Deterministic fast path: scenarios fully covered by a rule table skip RAG and the LLM
+        self.rule_engine = RuleEngine(rules_dir) if use_rule_engine else None
+        # Model cascade: clear-cut scenarios go to fast_model_name, borderline ones to model_name
+        self.router = ModelRouter(model_name, fast_model=fast_model_name, rule_engine=self.rule_engine,
+                                  difficulty_threshold=difficulty_threshold)
+        # Whole-decision memo for repeat checks (HITL retries, re-submissions); on disk so
+        # agents created per request share it
+        self.decision_cache = DecisionCache(decision_cache_dir, ttl_seconds=decision_ttl_s) if memoize_decisions else None
+
+        # check_scenario_async: retrieval runs on this pool; LLM calls are capped by
+        # the semaphore (in flight) and the token bucket (requests per minute quota)
+        self.retrieval_pool = ThreadPoolExecutor(max_workers=retrieval_workers, thread_name_prefix="retrieval")
+        self.max_concurrent_llm_calls = max_concurrent_llm_calls
+        self.llm_requests_per_minute = llm_requests_per_minute
+        self._async_loop = None
+        self.llm_singleflight = LLM_SINGLEFLIGHT
+        self.llm_breaker = circuit_breaker or LLM_CIRCUIT_BREAKER
+        # Stream policy generation and stop at the policy's end marker or closing fence
+        self.stream_llm = stream_llm
         
         # Configure Gemini
         # We force Mock Mode for reliable simulation if API is flaky
         self.mock_mode = True 
+        self.llm_cache_mode = resolve_cache_mode(llm_cache_mode)
+        self.models = {}  # model name -> CachedGenerativeModel, one per cascade tier
         if "GOOGLE_API_KEY" not in os.environ:
-             print("WARNING: GOOGLE_API_KEY not found. Switching to MOCK MODE.")
+            if self.llm_cache_mode == "replay":
+                # Recorded responses let the real LLM code path run offline
+                print(f"[{self.agent_name}] GOOGLE_API_KEY not found. Replaying recorded LLM responses.")
+                self.model = self._model(model_name)
+                self.mock_mode = False
+            else:
+                print("WARNING: GOOGLE_API_KEY not found. Switching to MOCK MODE.")
         else:
             genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
-            self.model = genai.GenerativeModel(model_name)
+            self.model = self._model(model_name)
             # self.mock_mode = False # Commented out to force mock
 
     def get_identity(self):
         return self.agent_card
 
-    def check_scenario(self, scenario_data):
-        """
-        Main A2A operation: Checks if a scenario is compliant.
-        """
-        print(f"[{self.agent_name}] Received scenario: {scenario_data}")
-        
-        # 1. RAG: Fetch relevant regulations
-        # We construct a query based on the scenario keys
-        query = f"regulations for {scenario_data.get('material_class', 'HazMat')} {scenario_data.get('package_type', '')}"
-        rag_results = self.librarian.query(query)
-        context_text = "\n".join(rag_results['documents'][0]) if rag_results['documents'] else "No regulations found."
-        
-        if self.mock_mode:
-            print(f"[{self.agent_name}] MOCK MODE: Simulating reasoning...")
-            # Simple deterministic logic for testing
-            temp = scenario_data.get("ambient_temperature_c", 0)
-            if temp > 38:
-                code = "result = False\nreason = 'Ambient temperature > 38C'"
+    def _model(self, model_name):
+        """Returns the (lazily created) model client for model_name."""
+        if model_name not in self.models:
+            if "GOOGLE_API_KEY" not in os.environ:
+                self.models[model_name] = CachedGenerativeModel(model_name, mode="replay")
             else:
-                code = "result = True\nreason = 'Ambient temperature within limits'"
-        else:
-            # 2. Code-as-Policy: Generate Validator Code
-            prompt = f"""
+                self.models[model_name] = CachedGenerativeModel(model_name, genai.GenerativeModel(model_name),
+                                                                mode=self.llm_cache_mode)
+        return self.models[model_name]
+
+    def _build_prompt(self, context_text, scenario_data):
+        return f"""
             You are the HazardComplianceAgent. Your job is to write a Python script to validate a HazMat transport scenario against the provided regulations.
             
             REGULATIONS:
             {context_text}
             
             SCENARIO DATA:
-            {json.dumps(scenario_data, indent=2)}
+            {json.dumps(scenario_data, sort_keys=True)}
             
             INSTRUCTIONS:
             1. Write a Python script that checks if the scenario complies with the regulations.
@@ -72,36 +158,436 @@ class HazardComplianceAgent:
             4. Use the variable `scenario` which contains the dictionary above.
             5. Do NOT use any external libraries other than `math` or `datetime`.
             6. Output ONLY the python code, no markdown formatting.
+            7. Assign `result` and `reason` exactly once each, as the last two top-level statements of the script.
+            8. Optionally, before that, set `evidence` to a small dict of the scenario values and limits you compared.
+            9. Only `result`, `reason` and `evidence` are kept after the script runs.
+            10. End the script with the line `{END_MARKER}`.
             """
-            
-            try:
-                response = self.model.generate_content(prompt)
-                code = response.text.replace("```python", "").replace("```", "").strip()
-            except Exception as e:
-                return {"compliant": False, "reason": f"LLM Error: {str(e)}"}
-            
-        print(f"[{self.agent_name}] Generated Policy Code:\n{code}\n")
-        
-        # 3. Execute Code
-        # We inject the scenario data into the context
-        execution_result = self.executor.execute(code, context_variables={"scenario": scenario_data})
+
+    def _cached_policy(self, context_text, scenario_data, model_name):
+        """
+        Looks up the validator policy in the policy cache. Policies are cached per
+        (regulation context, scenario key set, model, prompt version), so the LLM is only
+        called the first time a scenario shape is seen against a given regulation context.
         
+        Returns:
+            tuple: (key, (source, code_object) or None on a miss)
+        """
+        key = PolicyCache.make_key(context_text, scenario_data, model_name, PROMPT_VERSION)
+        cached = self.policy_cache.get(key)
+        if cached:
+            print(f"[{self.agent_name}] Policy cache hit ({key[:12]})")
+        return key, cached
+
+    def _store_policy(self, key, response_text, model_name):
+        code = response_text.replace("```python", "").replace("```", "").strip()
+        try:
+            return code, self.policy_cache.put(key, code, model_name)
+        except SyntaxError:
+            # Not cached; the sandbox reports the error as a validation failure
+            return code, code
+
+    def _prompt_key(self, prompt, model_name):
+        return hashlib.sha256(f"{model_name}|{prompt}".encode("utf-8")).hexdigest()
+
+    def _fallback_policy(self, context_text, scenario_data, why):
+        """
+        Policy used when the LLM path is unavailable: a cached policy generated by any
+        cascade tier for this context and key set, else the deterministic MOCK_POLICY if
+        the scenario has the field it checks, else UNAVAILABLE_POLICY (non-compliant,
+        decision path "fallback_unavailable") so nothing is approved unchecked.
+        """
+        print(f"[{self.agent_name}] LLM path unavailable ({why}). Falling back.")
+        for model_name in (self.router.strong_model, self.router.fast_model):
+            if not model_name:
+                continue
+            key = PolicyCache.make_key(context_text, scenario_data, model_name, PROMPT_VERSION)
+            cached = self.policy_cache.get(key)
+            if cached:
+                return cached[0], cached[1], "fallback_policy_cache"
+        if MOCK_POLICY_FIELD in scenario_data:
+            return MOCK_POLICY, MOCK_POLICY, "fallback_mock"
+        return UNAVAILABLE_POLICY, UNAVAILABLE_POLICY, "fallback_unavailable"
+
+    def _stream_policy_text(self, model_name, prompt):
+        """Streams the policy and stops generating at its end marker or closing fence (see PolicyStream)."""
+        stream = PolicyStream()
+        chunks = self._model(model_name).stream_content(prompt)
+        try:
+            for chunk in chunks:
+                if stream.feed(chunk):
+                    break
+        finally:
+            chunks.close()
+        if stream.stopped_early:
+            print(f"[{self.agent_name}] Policy end reached; stopped generation early")
+        return stream.text()
+
+    async def _stream_policy_text_async(self, model_name, prompt):
+        stream = PolicyStream()
+        chunks = self._model(model_name).stream_content_async(prompt)
+        try:
+            async for chunk in chunks:
+                if stream.feed(chunk):
+                    break
+        finally:
+            await chunks.aclose()
+        if stream.stopped_early:
+            print(f"[{self.agent_name}] Policy end reached; stopped generation early")
+        return stream.text()
+
+    def _generate_policy_text(self, model_name, prompt):
+        if self.stream_llm:
+            return self._stream_policy_text(model_name, prompt)
+        return self._model(model_name).generate_content(prompt).text
+
+    async def _generate_policy_text_async(self, model_name, prompt):
+        if self.stream_llm:
+            return await self._stream_policy_text_async(model_name, prompt)
+        response = await self._model(model_name).generate_content_async(prompt)
+        return response.text
+
+    def _guarded_call(self, call):
+        """Runs one LLM call under the circuit breaker, recording its outcome and latency."""
+        if not self.llm_breaker.allow():
+            raise CircuitOpenError(f"circuit '{self.llm_breaker.name}' is open")
+        start = time.perf_counter()
+        try:
+            response = call()
+        except Exception:
+            self.llm_breaker.record(False, (time.perf_counter() - start) * 1000)
+            raise
+        except BaseException:
+            # Cancelled or interrupted: no outcome, but a half-open probe slot must be freed
+            self.llm_breaker.release()
+            raise
+        self.llm_breaker.record(True, (time.perf_counter() - start) * 1000)
+        return response
+
+    async def _guarded_call_async(self, call):
+        if not self.llm_breaker.allow():
+            raise CircuitOpenError(f"circuit '{self.llm_breaker.name}' is open")
+        start = time.perf_counter()
+        try:
+            response = await call()
+        except Exception:
+            self.llm_breaker.record(False, (time.perf_counter() - start) * 1000)
+            raise
+        except BaseException:
+            # Cancelled or interrupted: no outcome, but a half-open probe slot must be freed
+            self.llm_breaker.release()
+            raise
+        self.llm_breaker.record(True, (time.perf_counter() - start) * 1000)
+        return response
+
+    def _get_policy(self, context_text, scenario_data, model_name):
+        """
+        Returns (source, code_object, path) for the validator policy, calling the LLM on a
+        cache miss. Concurrent misses with a byte-identical prompt share one LLM call (see
+        LLM_SINGLEFLIGHT). When the circuit breaker is open or the call fails, falls back
+        to _fallback_policy instead of failing the check.
+        """
+        key, cached = self._cached_policy(context_text, scenario_data, model_name)
+        if cached:
+            return cached[0], cached[1], "policy_cache"
+
+        prompt = self._build_prompt(context_text, scenario_data)
+        def generate():
+            text = self._guarded_call(lambda: self._generate_policy_text(model_name, prompt))
+            return self._store_policy(key, text, model_name)
+        try:
+            code, code_object = self.llm_singleflight.do(self._prompt_key(prompt, model_name), generate)
+        except Exception as e:
+            return self._fallback_policy(context_text, scenario_data, str(e))
+        return code, code_object, "llm"
+
+    def _bind_llm_limits(self):
+        # asyncio primitives belong to one event loop; rebuild them if the agent
+        # is reused from a new loop (e.g. successive asyncio.run calls)
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            self._async_loop = loop
+            self.llm_semaphore = asyncio.Semaphore(self.max_concurrent_llm_calls)
+            self.llm_rate_limiter = AsyncTokenBucket(self.llm_requests_per_minute / 60.0,
+                                                     capacity=max(1, self.llm_requests_per_minute // 6))
+
+    async def _get_policy_async(self, context_text, scenario_data, model_name):
+        key, cached = self._cached_policy(context_text, scenario_data, model_name)
+        if cached:
+            return cached[0], cached[1], "policy_cache"
+
+        prompt = self._build_prompt(context_text, scenario_data)
+        async def generate():
+            # Only the leader of a coalesced group takes a concurrency slot and a quota token
+            self._bind_llm_limits()
+            async with self.llm_semaphore:
+                await self.llm_rate_limiter.acquire()
+                # Latency excludes time spent queued on the semaphore and rate limiter
+                text = await self._guarded_call_async(lambda: self._generate_policy_text_async(model_name, prompt))
+            return self._store_policy(key, text, model_name)
+        try:
+            code, code_object = await self.llm_singleflight.do_async(self._prompt_key(prompt, model_name), generate)
+        except Exception as e:
+            return self._fallback_policy(context_text, scenario_data, str(e))
+        return code, code_object, "llm"
+
+    def _retrieval_query(self, scenario_data):
+        # We construct a query based on the scenario keys
+        return f"regulations for {scenario_data.get('material_class', 'HazMat')} {scenario_data.get('package_type', '')}"
+
+    def _retrieve_documents(self, query):
+        rag_results = self.librarian.query(query, n_results=self.retrieval_candidates)
+        return rag_results['documents'][0] if rag_results['documents'] else []
+
+    def _build_context(self, documents, query, scenario_data):
+        context = self.context_builder.build(documents, query, field_names=scenario_data.keys())
+        print(f"[{self.agent_name}] Context: kept {context['chunks_kept']}/{context['chunks_in']} chunks "
+              f"({context['duplicates_dropped']} duplicates{', truncated' if context['truncated'] else ''}), "
+              f"~{context['tokens_out']} tokens (saved ~{context['tokens_saved']})")
+        return context['text']
+
+    def _route(self, scenario_data):
+        routing = self.router.route(scenario_data)
+        print(f"[{self.agent_name}] Routed to {routing['tier']} model {routing['model']} "
+              f"(difficulty {routing['difficulty']})")
+        return routing
+
+    def _policy_for(self, context_text, scenario_data, model_name):
+        """Returns (source, executable, decision path) for the policy that validates scenario_data."""
+        if self.mock_mode:
+            print(f"[{self.agent_name}] MOCK MODE: Simulating reasoning...")
+            # Simple deterministic logic for testing
+            return MOCK_POLICY, MOCK_POLICY, "mock"
+        # 2. Code-as-Policy: Generate Validator Code (or reuse a cached policy)
+        return self._get_policy(context_text, scenario_data, model_name)
+
+    def _executable(self, code, code_object):
+        # Verification works on source; the executor's compile cache keeps that cheap
+        return code if self.executor.validator is not None else code_object
+
+    def _rule_decision(self, scenario_data):
+        """Returns the rule-engine decision, or None when no rule table fully covers the scenario."""
+        if self.rule_engine is None:
+            return None
+        decision = self.rule_engine.evaluate(scenario_data)
+        if decision is None:
+            return None
+        print(f"[{self.agent_name}] Decided by rule table {decision['rule_table']}")
+        return {
+            "compliant": decision["compliant"],
+            "reason": decision["reason"],
+            "provenance": {
+                "agent_card": self.agent_card,
+                "decision_path": "rule_engine",
+                "rule_table": decision["rule_table"],
+                "rules": decision["rules"],
+                "rag_context": None,
+                "generated_code": None
+            }
+        }
+
+    def _decision(self, execution_result, context_text, code, routing, path):
         if execution_result['success']:
             is_compliant = execution_result['result']
             # Extract reason if available
-            reason = execution_result['variables'].get('reason', 'No reason provided by validator.')
+            reason = execution_result['outputs'].get('reason', 'No reason provided by validator.')
         else:
             return {"compliant": False, "reason": f"Validation Error: {execution_result['error']}"}
         
-        return {
+        decision = {
             "compliant": is_compliant,
             "reason": reason,
             "provenance": {
                 "agent_card": self.agent_card,
+                "decision_path": path,
+                "routing": routing,
                 "rag_context": context_text,
                 "generated_code": code
             }
         }
+        if execution_result['outputs'].get('evidence') is not None:
+            decision["provenance"]["evidence"] = execution_result['outputs']['evidence']
+        return decision
+
+    def _policy_version(self):
+        """Everything besides the scenario and the corpus that can change a decision."""
+        rules = self.rule_engine.versions if self.rule_engine is not None else {}
+        models = "mock" if self.mock_mode else f"{self.router.strong_model},{self.router.fast_model}"
+        return f"prompt{PROMPT_VERSION}|rules{json.dumps(rules, sort_keys=True)}|{models}"
+
+    def _memoized(self, scenario_data):
+        """
+        Returns:
+            tuple: (memo key, memoized decision or None); (None, None) when memoization is off.
+        """
+        if self.decision_cache is None:
+            return None, None
+        key = DecisionCache.make_key(scenario_data, self.librarian.corpus_version(), self._policy_version())
+        decision = self.decision_cache.get(key)
+        if decision is not None:
+            print(f"[{self.agent_name}] Decision cache hit ({key[:12]})")
+            decision["cached"] = True
+        return key, decision
+
+    def _memoize(self, key, decision):
+        # Errors (no provenance) and fallback decisions are not memoized, so a retry re-runs
+        # the check; neither are rule-engine decisions, which are cheaper than a memo lookup
+        if key is not None and "provenance" in decision and \
+                decision["provenance"]["decision_path"] != "rule_engine" and \
+                not decision["provenance"]["decision_path"].startswith("fallback"):
+            try:
+                self.decision_cache.put(key, decision)
+            except OSError as e:
+                # A failed memo write must never fail the compliance check itself
+                print(f"[{self.agent_name}] Could not memoize decision ({e}).")
+            decision["cached"] = False
+        return decision
+
+    def check_scenario(self, scenario_data):
+        """
+        Main A2A operation: Checks if a scenario is compliant.
+        Scenarios a rule table covers are decided by the rule engine first. Repeat checks
+        of any other (canonicalized) scenario are served from the decision cache with
+        cached=True until the TTL, corpus or policy version changes.
+        """
+        print(f"[{self.agent_name}] Received scenario: {scenario_data}")
+        rule_decision = self._rule_decision(scenario_data)
+        if rule_decision:
+            return rule_decision
+        key, decision = self._memoized(scenario_data)
+        if decision is not None:
+            return decision
+        return self._memoize(key, self._check_uncached(scenario_data))
+
+    def _check_uncached(self, scenario_data):
+        # 1. RAG: Fetch relevant regulations
+        query = self._retrieval_query(scenario_data)
+        context_text = self._build_context(self._retrieve_documents(query), query, scenario_data)
+        
+        routing = self._route(scenario_data)
+        try:
+            code, code_object, path = self._policy_for(context_text, scenario_data, routing["model"])
+        except Exception as e:
+            return {"compliant": False, "reason": f"LLM Error: {str(e)}"}
+            
+        print(f"[{self.agent_name}] Generated Policy Code:\n{code}\n")
+        
+        # 3. Execute Code
+        # We inject the scenario data into the context
+        execution_result = self.executor.execute(self._executable(code, code_object), context_variables={"scenario": scenario_data})
+        return self._decision(execution_result, context_text, code, routing, path)
+
+    async def check_scenario_async(self, scenario_data):
+        """
+        Async variant of check_scenario for callers that keep many checks in flight.
+        Retrieval and policy execution run on a thread pool; the LLM call is awaited under
+        a concurrency cap (max_concurrent_llm_calls) and a token-bucket rate limit
+        (llm_requests_per_minute).
+        """
+        print(f"[{self.agent_name}] Received scenario: {scenario_data}")
+        rule_decision = self._rule_decision(scenario_data)
+        if rule_decision:
+            return rule_decision
+        key, decision = self._memoized(scenario_data)
+        if decision is not None:
+            return decision
+        return self._memoize(key, await self._check_uncached_async(scenario_data))
+
+    async def _check_uncached_async(self, scenario_data):
+        loop = asyncio.get_running_loop()
+
+        # 1. RAG: Fetch relevant regulations (blocking, so off the event loop)
+        query = self._retrieval_query(scenario_data)
+        documents = await loop.run_in_executor(self.retrieval_pool, self._retrieve_documents, query)
+        context_text = self._build_context(documents, query, scenario_data)
+
+        routing = self._route(scenario_data)
+        try:
+            if self.mock_mode:
+                code, code_object, path = self._policy_for(context_text, scenario_data, routing["model"])
+            else:
+                code, code_object, path = await self._get_policy_async(context_text, scenario_data, routing["model"])
+        except Exception as e:
+            return {"compliant": False, "reason": f"LLM Error: {str(e)}"}
+
+        # 3. Execute Code (blocking: in-process or waiting on a pool worker, so off the event loop too)
+        execution_result = await loop.run_in_executor(
+            self.retrieval_pool, lambda: self.executor.execute(self._executable(code, code_object),
+                                                               context_variables={"scenario": scenario_data}))
+        return self._decision(execution_result, context_text, code, routing, path)
+
+    def check_scenarios(self, scenarios, window=BATCH_WINDOW):
+        """
+        Batch A2A operation: checks a whole manifest of scenarios.
+        
+        Scenarios are read in windows of `window`. Within a window, scenarios that
+        share a retrieval query are retrieved once, scenarios that also share a key
+        set and routed model share one policy, and each policy runs over its group in a single
+        sandbox call.
+        
+        Args:
+            scenarios (iterable): Scenario dicts; may be a generator of any length.
+            window (int): Scenarios buffered at a time.
+            
+        Yields:
+            dict: One decision per scenario (same shape as check_scenario), in input order.
+        """
+        buffer = []
+        for scenario_data in scenarios:
+            buffer.append(scenario_data)
+            if len(buffer) >= window:
+                yield from self._check_window(buffer)
+                buffer = []
+        if buffer:
+            yield from self._check_window(buffer)
+
+    def _check_window(self, scenarios):
+        print(f"[{self.agent_name}] Checking batch of {len(scenarios)} scenarios...")
+        decisions = [None] * len(scenarios)
+
+        # Rule-covered scenarios are decided inline and memoized ones served from the
+        # decision cache; group the rest by retrieval query, then by key set and routed
+        # model (with the context, the policy cache key)
+        groups = {}
+        routings = {}
+        memo_keys = [None] * len(scenarios)
+        for i, scenario_data in enumerate(scenarios):
+            decisions[i] = self._rule_decision(scenario_data)
+            if decisions[i]:
+                continue
+            memo_keys[i], decisions[i] = self._memoized(scenario_data)
+            if decisions[i]:
+                continue
+            routings[i] = self._route(scenario_data)
+            query = self._retrieval_query(scenario_data)
+            policy_key = (tuple(sorted(scenario_data.keys())), routings[i]["model"])
+            groups.setdefault(query, {}).setdefault(policy_key, []).append(i)
+
+        for query, policy_groups in groups.items():
+            documents = self._retrieve_documents(query)
+            for (_, model_name), indices in policy_groups.items():
+                # Reranking uses the field names, which are shared within a key-set group
+                context_text = self._build_context(documents, query, scenarios[indices[0]])
+                try:
+                    code, code_object, path = self._policy_for(context_text, scenarios[indices[0]], model_name)
+                except Exception as e:
+                    for i in indices:
+                        decisions[i] = {"compliant": False, "reason": f"LLM Error: {str(e)}"}
+                    continue
+
+                # Elementwise policies run vectorized over the whole group (see execute_batch)
+                batch = self.executor.execute_batch(code, [scenarios[i] for i in indices])
+                for row, i in enumerate(indices):
+                    outputs = {"reason": batch["reason"][row], "evidence": batch["evidence"][row]}
+                    execution_result = {
+                        "success": bool(batch["success"][row]),
+                        "result": _plain(batch["result"][row]),
+                        "outputs": {name: value for name, value in outputs.items() if value is not None},
+                        "error": batch["error"][row]
+                    }
+                    decisions[i] = self._memoize(memo_keys[i], self._decision(execution_result, context_text, code, routings[i], path))
+
+        return decisions
 
 if __name__ == "__main__":
     # Test
@@ -114,3 +600,7 @@ if __name__ == "__main__":
     }
     decision = agent.check_scenario(scenario)
     print(f"\nDecision: {decision}")
+
+    manifest = [dict(scenario, ambient_temperature_c=t) for t in (20, 38, 38.1, 45)]
+    for scn, decision in zip(manifest, agent.check_scenarios(manifest)):
+        print(f"{scn['ambient_temperature_c']}C -> {decision['compliant']} ({decision['reason']})")
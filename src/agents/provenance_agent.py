@@ -2,6 +2,7 @@ import json
 from src.utils.firestore_client import FirestoreClient
 from src.security.interceptor import MessageSigner
 from src.security.agent_card import AgentCardManager
+from src.utils.blob_store import BlobStore
 
 class HazardProvenanceAgent:
     def __init__(self):
@@ -14,6 +15,7 @@ class HazardProvenanceAgent:
         
         self.db = FirestoreClient()
         self.signer = MessageSigner(self.agent_name)
+        self.blobs = BlobStore()
 
     def log_event(self, event_type, agent_id, payload, signature=None):
         """
@@ -43,6 +45,10 @@ class HazardProvenanceAgent:
                 })
                 return {"success": False, "error": "Invalid Signature"}
         
+        # Decision evidence is stored once in the blob store; the event keeps references
+        if isinstance(payload.get("decision_data"), dict):
+            payload = dict(payload, decision_data=self.blobs.externalize(payload["decision_data"]))
+
         event_doc = {
             "type": event_type,
             "agent_id": agent_id,
@@ -60,8 +66,11 @@ class HazardProvenanceAgent:
         print(f"[{self.agent_name}] Event logged with ID: {doc_id}")
         return {"success": True, "doc_id": doc_id}
 
-    def get_provenance_graph(self):
-        return self.db.get_all_documents()
+    def get_provenance_graph(self, resolve_evidence=False):
+        events = self.db.get_all_documents()
+        if resolve_evidence:
+            return self.blobs.resolve(events)
+        return events
 
 if __name__ == "__main__":
     # Test
@@ -3,19 +3,25 @@ import json
 import random
 import google.generativeai as genai
 from src.security.agent_card import AgentCardManager
+from src.utils.llm_cache import CachedGenerativeModel, resolve_cache_mode
 
 class RedTeamAgent:
-    def __init__(self, model_name="gemini-2.0-flash-exp"):
+    def __init__(self, model_name="gemini-2.0-flash-exp", llm_cache_mode=None):
         self.agent_name = "RedTeamAgent"
         self.card_manager = AgentCardManager(self.agent_name)
         
         # Configure Gemini
-        if "GOOGLE_API_KEY" not in os.environ:
+        llm_cache_mode = resolve_cache_mode(llm_cache_mode)
+        if "GOOGLE_API_KEY" not in os.environ and llm_cache_mode == "replay":
+            print(f"[{self.agent_name}] GOOGLE_API_KEY not found. Replaying recorded LLM responses.")
+            self.model = CachedGenerativeModel(model_name, mode="replay")
+            self.mock_mode = False
+        elif "GOOGLE_API_KEY" not in os.environ:
              print("WARNING: GOOGLE_API_KEY not found. RedTeamAgent using heuristic generation.")
              self.mock_mode = True
         else:
             genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
-            self.model = genai.GenerativeModel(model_name)
+            self.model = CachedGenerativeModel(model_name, genai.GenerativeModel(model_name), mode=llm_cache_mode)
             self.mock_mode = False # Set to True if API is flaky
 
     def generate_adversarial_scenarios(self, count=3):
@@ -27,18 +33,7 @@ class RedTeamAgent:
         scenarios = []
         
         if self.mock_mode:
-            # Heuristic generation of edge cases
-            for i in range(count):
-                # Edge case: Temperature exactly at the limit or slightly above
-                temp = 38 + random.choice([-0.1, 0.0, 0.1, 5.0])
-                scenarios.append({
-                    "id": f"ADV-MOCK-{i}",
-                    "material_class": "Class 7",
-                    "package_type": "Type B(U)",
-                    "ambient_temperature_c": round(temp, 1),
-                    "transport_index": 0.5,
-                    "description": "Adversarial temperature test"
-                })
+            scenarios = self._heuristic_scenarios(count)
         else:
             prompt = f"""
             You are a Red Team Agent testing a Hazardous Material Compliance System.
@@ -65,11 +60,27 @@ class RedTeamAgent:
                 scenarios = json.loads(text)
             except Exception as e:
                 print(f"[{self.agent_name}] LLM Generation failed: {e}. Falling back to heuristics.")
-                # Fallback
-                return self.generate_adversarial_scenarios(count)
+                # Fallback (calling ourselves again would loop forever while mock_mode is off)
+                return self._heuristic_scenarios(count)
 
         return scenarios
 
+    def _heuristic_scenarios(self, count):
+        # Heuristic generation of edge cases
+        scenarios = []
+        for i in range(count):
+            # Edge case: Temperature exactly at the limit or slightly above
+            temp = 38 + random.choice([-0.1, 0.0, 0.1, 5.0])
+            scenarios.append({
+                "id": f"ADV-MOCK-{i}",
+                "material_class": "Class 7",
+                "package_type": "Type B(U)",
+                "ambient_temperature_c": round(temp, 1),
+                "transport_index": 0.5,
+                "description": "Adversarial temperature test"
+            })
+        return scenarios
+
 if __name__ == "__main__":
     agent = RedTeamAgent()
     scenarios = agent.generate_adversarial_scenarios(2)
@@ -1,27 +1,177 @@
 import sys
 import io
-import contextlib
+import ast
+import types
+import hashlib
+import functools
+import threading
 import traceback
+from collections import OrderedDict
+from src.sandbox.metrics import PolicyMetrics, measure, policy_hash, start_tracing
 
-class SandboxExecutor:
-    def __init__(self):
-        self.allowed_modules = ['math', 'datetime', 'json']
+try:
+    import numpy as np  # Optional: enables vectorized execute_batch
+except ImportError:
+    np = None
+
+# Compiled policies kept per executor (LRU, keyed by source hash)
+CODE_CACHE_SIZE = 256
+
+# Variables a policy declares as its outputs; only these leave the sandbox namespace
+DECLARED_OUTPUTS = ("result", "reason", "evidence")
+
+# AST nodes a policy may use to run vectorized over whole columns in execute_batch.
+# No control flow, boolean operators, `not` or `~` (their meaning differs between a
+# bool and a bool array) and no augmented assignment (in place on an array, rebinding
+# per row); anything else runs row by row.
+VECTORIZABLE_NODES = (
+    ast.Module, ast.Assign, ast.Name, ast.Load, ast.Store, ast.Constant,
+    ast.Subscript, ast.Call, ast.Attribute, ast.Compare, ast.BinOp, ast.UnaryOp,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+    ast.BitAnd, ast.BitOr, ast.USub, ast.UAdd
+)
+
+# Builtins a vectorized policy may call (they apply elementwise to arrays)
+VECTORIZABLE_CALLS = ("abs",)
+
+# Numbers run vectorized as float64, which is exact for integers up to 2**53; larger
+# values or constants run row by row with Python's arbitrary-precision ints
+EXACT_FLOAT_INT = 2 ** 53
+
+
+def _vectorizable(source, variable_name):
+    """True if the policy only does elementwise arithmetic and comparisons on `variable_name`."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return False
+    for node in ast.walk(tree):
+        if not isinstance(node, VECTORIZABLE_NODES):
+            return False
+        if isinstance(node, ast.Attribute):
+            # Only scenario.get(...); array methods stay out of reach of the policy
+            if node.attr != "get" or not isinstance(node.value, ast.Name) or node.value.id != variable_name:
+                return False
+        if isinstance(node, ast.Subscript):
+            # scenario["field"] only; indexing into a value means something else per row
+            if not isinstance(node.value, ast.Name) or node.value.id != variable_name:
+                return False
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+                and not isinstance(node.value, bool) and abs(node.value) > EXACT_FLOAT_INT:
+            return False
+        if isinstance(node, ast.Call):
+            func = node.func
+            if isinstance(func, ast.Name) and func.id in VECTORIZABLE_CALLS:
+                continue
+            if not isinstance(func, ast.Attribute) or node.keywords:
+                return False
+    return True
+
+
+def _column(values):
+    """
+    Read-only NumPy copy of one scenario field (numbers as float64, so integer overflow
+    cannot wrap), or None if its values are not uniformly bool, number or str, or an
+    integer exceeds EXACT_FLOAT_INT.
+    """
+    if isinstance(values, np.ndarray):
+        if values.ndim != 1:
+            return None
+        if values.dtype.kind not in "biuf":
+            values = values.tolist()
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind in "iu" and len(values) and np.abs(values.astype(object)).max() > EXACT_FLOAT_INT:
+            return None
+        column = values.astype(bool if values.dtype.kind == "b" else np.float64)  # always a copy
+    elif all(isinstance(v, bool) for v in values):
+        column = np.array(values, dtype=bool)
+    elif all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        if any(isinstance(v, int) and abs(v) > EXACT_FLOAT_INT for v in values):
+            return None
+        column = np.array(values, dtype=np.float64)
+    elif all(isinstance(v, str) for v in values):
+        column = np.array(values, dtype=object)
+    else:
+        return None
+    # In-place operations raise instead of changing the caller's data; execute_batch falls back
+    column.setflags(write=False)
+    return column
+
+
+def _object_array(values):
+    # One object per row, even when the values are themselves lists
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
+
+
+class _Columns:
+    """Read-only, dict-like view of a columnar batch: scenario["field"] is the whole column."""
+
+    def __init__(self, columns):
+        self._columns = columns
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    def get(self, name, default=None):
+        return self._columns.get(name, default)
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
 
-    def execute(self, code, context_variables={}):
+class SandboxExecutor:
+    def __init__(self, code_cache_size=CODE_CACHE_SIZE, isolated=False, pool=None, verify=False,
+                 instrument=False):
         """
-        Executes the provided Python code in a restricted environment.
-        
         Args:
-            code (str): The Python code to execute.
-            context_variables (dict): Variables to inject into the execution scope.
-            
-        Returns:
-            dict: {'success': bool, 'result': any, 'stdout': str, 'error': str}
+            code_cache_size (int): Compiled policies kept in the LRU.
+            isolated (bool): Run policies in worker processes with CPU, memory and
+                             wall-clock limits (see process_pool) instead of in-process.
+            pool (ProcessSandboxPool): Pool for isolated mode; defaults to the shared pool.
+            verify (bool): Statically verify policy source (see validator). Verified
+                           policies run in-process; the rest (and code objects, which
+                           cannot be verified) run isolated.
+            instrument (bool): Measure every run (wall/CPU time, peak memory, executed
+                               lines; see metrics) into result['metrics'] and aggregate
+                               per-policy histograms in self.metrics. Adds tracing overhead.
         """
-        # Capture stdout
-        stdout_capture = io.StringIO()
-        
-        # restricted globals
+        self.allowed_modules = ['math', 'datetime', 'json']
+        self.pool = None
+        if isolated or verify or pool is not None:
+            from src.sandbox.process_pool import shared_pool
+            self.pool = pool or shared_pool()
+
+        # Built once and read-only; every execution gets a shallow copy (plus its own builtins dict)
+        base_namespace = self._base_globals()
+        base_namespace["__builtins__"] = types.MappingProxyType(base_namespace["__builtins__"])
+        self.base_namespace = types.MappingProxyType(base_namespace)
+
+        self.metrics = None
+        if instrument:
+            self.metrics = PolicyMetrics()
+            start_tracing()
+
+        self.validator = None
+        if verify:
+            from src.sandbox.validator import PolicyValidator
+            self.validator = PolicyValidator(allowed_names=list(base_namespace) + list(base_namespace["__builtins__"]))
+
+        self.code_cache_size = code_cache_size
+        self._code_cache = OrderedDict()  # sha256(source) -> code object
+        self._code_cache_lock = threading.Lock()
+        self.code_cache_hits = 0
+        self.code_cache_misses = 0
+
+    def _base_globals(self):
         safe_globals = {
             "__builtins__": {
                 "print": print,
@@ -50,6 +200,92 @@ class SandboxExecutor:
                 safe_globals[mod_name] = mod
             except ImportError:
                 pass
+        return safe_globals
+
+    def _compile(self, code):
+        """Returns a code object for source or code, compiling each distinct source once."""
+        if not isinstance(code, str):
+            return code
+        key = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        with self._code_cache_lock:
+            code_object = self._code_cache.get(key)
+            if code_object is not None:
+                self._code_cache.move_to_end(key)
+                self.code_cache_hits += 1
+                return code_object
+            self.code_cache_misses += 1
+
+        code_object = compile(code, f"<policy {key[:12]}>", "exec")
+        with self._code_cache_lock:
+            self._code_cache[key] = code_object
+            if len(self._code_cache) > self.code_cache_size:
+                self._code_cache.popitem(last=False)
+        return code_object
+
+    def _in_process(self, code):
+        """True if code may run in this process: no pool, or verified source."""
+        if self.pool is None:
+            return True
+        if self.validator is None or not isinstance(code, str):
+            return False
+        violation = self.validator.check(code)
+        if violation is not None:
+            print(f"[SandboxExecutor] Policy not verified ({violation}); running isolated.")
+        return violation is None
+
+    def _execute_isolated(self, code, context_variables, base_globals=None):
+        if base_globals is not None:
+            # Only plain variables travel to the worker; it has its own base namespace
+            shared = {k: v for k, v in base_globals.items() if k not in self.base_namespace}
+            context_variables = dict(shared, **context_variables)
+        return self.pool.execute(code, context_variables, instrument=self.metrics is not None)
+
+    def _record(self, digest, execution):
+        if self.metrics is not None and "metrics" in execution:
+            self.metrics.record(digest, execution["metrics"], success=execution["success"])
+
+    def code_cache_stats(self):
+        return {
+            "size": len(self._code_cache),
+            "max_size": self.code_cache_size,
+            "hits": self.code_cache_hits,
+            "misses": self.code_cache_misses
+        }
+
+    def execute(self, code, context_variables={}, base_globals=None):
+        """
+        Executes the provided Python code in a restricted environment.
+        
+        Args:
+            code (str or code): The Python code (or compiled code object) to execute.
+            context_variables (dict): Variables to inject into the execution scope.
+            base_globals (dict): Namespace to copy instead of base_namespace (e.g. with shared variables).
+            
+        Returns:
+            dict: {'success': bool, 'result': any, 'outputs': dict, 'stdout': str, 'error': str},
+                  plus 'metrics' when the executor is instrumented. 'outputs' holds the
+                  DECLARED_OUTPUTS the policy assigned; the rest of its namespace is dropped.
+        """
+        if not self._in_process(code):
+            execution = self._execute_isolated(code, context_variables, base_globals)
+        else:
+            execution = self._execute_local(code, context_variables, base_globals, instrument=self.metrics is not None)
+        if self.metrics is not None:
+            self._record(policy_hash(code), execution)
+        return execution
+
+    def _execute_local(self, code, context_variables, base_globals=None, instrument=False):
+        # Capture stdout
+        stdout_capture = io.StringIO()
+        
+        # restricted globals
+        if base_globals is None:
+            base_globals = self.base_namespace
+        safe_globals = dict(base_globals)
+        # Own copy of builtins too: policy code can write to __builtins__
+        safe_globals["__builtins__"] = dict(base_globals["__builtins__"])
+        # Per-run print rather than redirect_stdout, which swaps sys.stdout for every thread
+        safe_globals["__builtins__"]["print"] = functools.partial(print, file=stdout_capture)
 
         # Inject context variables
         safe_globals.update(context_variables)
@@ -57,34 +293,165 @@ class SandboxExecutor:
         result = None
         success = False
         error_msg = ""
+        metrics = None
 
         try:
-            with contextlib.redirect_stdout(stdout_capture):
-                # We execute the code. The code is expected to define a function 'validate(scenario)' 
-                # or just run and set a variable 'result'.
-                # For Code-as-Policy, usually we expect a 'check()' function or similar.
-                # Let's assume the code runs and we look for a 'result' variable or return value.
-                exec(code, safe_globals)
-                
-                # Check if 'result' is in globals
-                if 'result' in safe_globals:
-                    result = safe_globals['result']
-                    success = True
-                else:
-                    # If no result variable, maybe it was just a script.
-                    success = True
+            # We execute the code. The code is expected to define a function 'validate(scenario)' 
+            # or just run and set a variable 'result'.
+            # For Code-as-Policy, usually we expect a 'check()' function or similar.
+            # Let's assume the code runs and we look for a 'result' variable or return value.
+            code_object = self._compile(code)
+            if instrument:
+                with measure(code_object) as metrics:
+                    exec(code_object, safe_globals)
+            else:
+                exec(code_object, safe_globals)
+            
+            # Check if 'result' is in globals
+            if 'result' in safe_globals:
+                result = safe_globals['result']
+                success = True
+            else:
+                # If no result variable, maybe it was just a script.
+                success = True
                     
         except Exception as e:
             success = False
             error_msg = traceback.format_exc()
 
-        return {
+        execution = {
             "success": success,
             "result": result,
-            "variables": safe_globals, # Return all variables to capture 'reason'
+            "outputs": {name: safe_globals[name] for name in DECLARED_OUTPUTS if name in safe_globals},
             "stdout": stdout_capture.getvalue(),
             "error": error_msg
         }
+        if metrics is not None:
+            execution["metrics"] = metrics
+        return execution
+
+    def execute_many(self, code, scenarios, variable_name="scenario", shared_variables={}):
+        """
+        Runs one policy over many inputs in a single sandbox call. The code is
+        compiled once and the restricted namespace is built once; each input
+        gets a fresh copy of it so runs cannot leak state into each other.
+        
+        Args:
+            code (str or code): The policy to run.
+            scenarios (iterable): One value per run, injected as `variable_name`.
+            variable_name (str): Name the policy reads its input from.
+            shared_variables (dict): Extra variables injected into every run.
+            
+        Returns:
+            list: One result dict per input, in input order (same shape as execute()).
+        """
+        base_globals = dict(self.base_namespace)
+        base_globals.update(shared_variables)
+        digest = policy_hash(code) if self.metrics is not None else None
+        if not self._in_process(code):
+            results = [self._execute_isolated(code, {variable_name: scenario}, base_globals) for scenario in scenarios]
+            for execution in results:
+                self._record(digest, execution)
+            return results
+
+        try:
+            code = self._compile(code)
+        except SyntaxError:
+            error_msg = traceback.format_exc()
+            return [{"success": False, "result": None, "outputs": {}, "stdout": "", "error": error_msg}
+                    for _ in scenarios]
+
+        results = []
+        for scenario in scenarios:
+            execution = self._execute_local(code, {variable_name: scenario}, base_globals, instrument=digest is not None)
+            self._record(digest, execution)
+            results.append(execution)
+        return results
+
+    def _execute_vectorized(self, code, columns, rows, variable_name, shared_variables):
+        """Runs the policy once over whole columns; returns (result, reason) arrays or None to fall back."""
+        safe_globals = dict(self.base_namespace)
+        safe_globals["__builtins__"] = dict(self.base_namespace["__builtins__"])
+        safe_globals.update(shared_variables)
+        safe_globals[variable_name] = _Columns(columns)
+        try:
+            # Division by zero etc. must fail like it does per row, not turn into inf/nan
+            with np.errstate(all="raise"):
+                exec(self._compile(code), safe_globals)
+            if "result" not in safe_globals or "evidence" in safe_globals:
+                # Evidence is per-row data; leave it to the row-by-row path
+                return None
+            result = np.broadcast_to(np.asarray(safe_globals["result"]), (rows,)).copy()
+            reason = safe_globals.get("reason")
+            if isinstance(reason, str) or reason is None:
+                reason = np.full(rows, reason, dtype=object)
+            else:
+                reason = np.broadcast_to(np.asarray(reason, dtype=object), (rows,)).copy()
+        except Exception:
+            # e.g. a column compared with a str, or a shape that is not one value per row
+            return None
+        return result, reason
+
+    def execute_batch(self, code, batch, variable_name="scenario", shared_variables={}):
+        """
+        Runs one policy over a columnar batch of scenarios.
+        
+        When NumPy is available, execution is in-process, the policy is source code
+        that only does elementwise arithmetic and comparisons (no if/and/or, see
+        VECTORIZABLE_NODES) and every field is uniformly bool, number or str, the
+        policy runs once with `variable_name` bound to the columns as arrays.
+        Otherwise it falls back to execute_many: one run per row over a namespace
+        built once.
+        
+        Args:
+            code (str or code): The policy to run.
+            batch (dict or list): Columns (field -> array or list, all the same length),
+                                  or a list of scenario dicts.
+            variable_name (str): Name the policy reads its input from.
+            shared_variables (dict): Extra variables injected into every run.
+            
+        Returns:
+            dict: {'result': array, 'reason': array, 'evidence': list, 'success': array of bool,
+                   'error': list of str, 'vectorized': bool}; one entry per row, in input
+                   order. Arrays are NumPy arrays, or lists when NumPy is not installed.
+        """
+        if isinstance(batch, dict):
+            columns = dict(batch)
+            lengths = {len(values) for values in columns.values()}
+            if len(lengths) > 1:
+                raise ValueError(f"Batch columns have different lengths: {sorted(lengths)}")
+            rows = lengths.pop() if lengths else 0
+        else:
+            batch = list(batch)
+            rows = len(batch)
+            columns = None
+            if batch and all(row.keys() == batch[0].keys() for row in batch):
+                columns = {name: [row[name] for row in batch] for name in batch[0]}
+
+        if np is not None and rows and columns is not None and isinstance(code, str) \
+                and _vectorizable(code, variable_name) and self._in_process(code):
+            arrays = {name: _column(values) for name, values in columns.items()}
+            if all(array is not None for array in arrays.values()):
+                vectorized = self._execute_vectorized(code, arrays, rows, variable_name, shared_variables)
+                if vectorized is not None:
+                    result, reason = vectorized
+                    return {"result": result, "reason": reason, "evidence": [None] * rows,
+                            "success": np.ones(rows, dtype=bool), "error": [""] * rows, "vectorized": True}
+
+        if isinstance(batch, dict):
+            names = list(columns)
+            values = [columns[name].tolist() if hasattr(columns[name], "tolist") else columns[name] for name in names]
+            batch = [dict(zip(names, row)) for row in zip(*values)]
+        executions = self.execute_many(code, batch, variable_name=variable_name, shared_variables=shared_variables)
+        result = [e["result"] for e in executions]
+        reason = [e["outputs"].get("reason") for e in executions]
+        success = [e["success"] for e in executions]
+        if np is not None:
+            result = _object_array(result)
+            reason = _object_array(reason)
+            success = np.array(success, dtype=bool)
+        return {"result": result, "reason": reason, "evidence": [e["outputs"].get("evidence") for e in executions],
+                "success": success, "error": [e["error"] for e in executions], "vectorized": False}
 
 if __name__ == "__main__":
     # Test
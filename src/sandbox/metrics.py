@@ -0,0 +1,167 @@
+import sys
+import time
+import marshal
+import hashlib
+import threading
+import contextlib
+import tracemalloc
+from collections import OrderedDict
+
+# Upper bounds of the histogram buckets per metric; the last bucket is unbounded
+METRIC_BUCKETS = {
+    "wall_ms": (0.1, 1, 10, 100, 1000),
+    "cpu_ms": (0.1, 1, 10, 100, 1000),
+    "peak_kb": (16, 64, 256, 1024, 16384),
+    "lines": (10, 100, 1000, 10000, 100000),
+}
+
+# Policies with histograms kept per PolicyMetrics (LRU)
+MAX_POLICIES = 1024
+
+
+def policy_hash(code):
+    """sha256 of policy source, or of the marshalled code object."""
+    if isinstance(code, str):
+        return hashlib.sha256(code.encode("utf-8")).hexdigest()
+    return hashlib.sha256(marshal.dumps(code)).hexdigest()
+
+
+# tracemalloc's peak is process-wide, so measured runs take turns (see measure)
+_MEASURE_LOCK = threading.Lock()
+
+
+def start_tracing():
+    """Starts tracemalloc once for the process; it then stays on (starting and stopping per run is costly)."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+@contextlib.contextmanager
+def measure(code_object):
+    """
+    Measures the enclosed execution of code_object; the yielded dict is filled on exit
+    with wall_ms, cpu_ms (this thread), peak_kb (tracemalloc peak above the starting
+    allocation) and lines (line events in frames of code_object's file).
+
+    The tracemalloc peak is process-wide, so measured runs are serialized: concurrent
+    instrumented runs wait for each other rather than overwrite each other's peak.
+    Allocations by uninstrumented threads during a run still count towards it.
+    """
+    metrics = {}
+    lines = [0]
+    filename = code_object.co_filename
+
+    def trace_lines(frame, event, arg):
+        if event == "line":
+            lines[0] += 1
+        return trace_lines
+
+    def trace_calls(frame, event, arg):
+        return trace_lines if frame.f_code.co_filename == filename else None
+
+    start_tracing()
+    with _MEASURE_LOCK:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        previous_trace = sys.gettrace()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        sys.settrace(trace_calls)
+        try:
+            yield metrics
+        finally:
+            sys.settrace(previous_trace)
+            metrics["wall_ms"] = (time.perf_counter() - wall_start) * 1000
+            metrics["cpu_ms"] = (time.thread_time() - cpu_start) * 1000
+            metrics["peak_kb"] = max(0, tracemalloc.get_traced_memory()[1] - baseline) / 1024
+            metrics["lines"] = lines[0]
+
+
+class _Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = 0
+
+    def add(self, value):
+        index = 0
+        while index < len(self.bounds) and value > self.bounds[index]:
+            index += 1
+        self.counts[index] += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.samples += 1
+
+    def summary(self):
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            "count": self.samples,
+            "mean": self.total / self.samples if self.samples else 0.0,
+            "max": self.max,
+            "buckets": dict(zip(labels, self.counts))
+        }
+
+
+class PolicyMetrics:
+    """
+    Aggregate resource histograms per policy hash (see METRIC_BUCKETS).
+
+    Fed with the per-execution metrics dicts produced by measure(); used to find
+    generated policies that are slow, CPU- or memory-hungry before they become an
+    incident. Keeps the max_policies most recently executed policies.
+    """
+
+    def __init__(self, max_policies=MAX_POLICIES):
+        self.max_policies = max_policies
+        self._policies = OrderedDict()  # policy hash -> {"executions", "errors", metric -> _Histogram}
+        self._lock = threading.Lock()
+
+    def record(self, policy_hash, metrics, success=True):
+        with self._lock:
+            entry = self._policies.get(policy_hash)
+            if entry is None:
+                entry = {"executions": 0, "errors": 0}
+                entry.update({name: _Histogram(bounds) for name, bounds in METRIC_BUCKETS.items()})
+                self._policies[policy_hash] = entry
+                if len(self._policies) > self.max_policies:
+                    self._policies.popitem(last=False)
+            else:
+                self._policies.move_to_end(policy_hash)
+            entry["executions"] += 1
+            if not success:
+                entry["errors"] += 1
+            for name in METRIC_BUCKETS:
+                if metrics.get(name) is not None:
+                    entry[name].add(metrics[name])
+
+    def summary(self, policy_hash):
+        """
+        Returns:
+            dict: executions, errors and a histogram summary per metric; None if unknown.
+        """
+        with self._lock:
+            entry = self._policies.get(policy_hash)
+            if entry is None:
+                return None
+            summary = {"executions": entry["executions"], "errors": entry["errors"]}
+            summary.update({name: entry[name].summary() for name in METRIC_BUCKETS})
+            return summary
+
+    def worst(self, metric="cpu_ms", n=5):
+        """
+        Returns:
+            list: (policy hash, max value of metric) for the n policies with the highest max.
+        """
+        with self._lock:
+            ranked = sorted(((h, entry[metric].max) for h, entry in self._policies.items()),
+                            key=lambda item: item[1], reverse=True)
+        return ranked[:n]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "policies": len(self._policies),
+                "executions": sum(entry["executions"] for entry in self._policies.values())
+            }
@@ -0,0 +1,224 @@
+import time
+import queue
+import signal
+import marshal
+import hashlib
+import threading
+import multiprocessing
+
+try:
+    import resource  # Unix only; without it workers run without rlimits
+except ImportError:
+    resource = None
+
+# Defaults for the shared pool (see shared_pool)
+POOL_WORKERS = 2
+CPU_SECONDS = 2           # CPU time per execution (RLIMIT_CPU)
+MEMORY_MB = 512           # address space per worker (RLIMIT_AS)
+TIMEOUT_S = 5.0           # wall clock per execution, enforced by the parent
+MAX_TASKS_PER_WORKER = 1000
+
+# Output types returned from a worker; anything else (modules, functions) stays behind
+RETURNED_TYPES = (bool, int, float, str, type(None), list, tuple, dict)
+
+
+def _set_cpu_limit(cpu_seconds):
+    # RLIMIT_CPU counts the process's total CPU time, so each task gets "used so far + budget"
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = used + cpu_seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_main(conn, cpu_seconds, memory_mb):
+    """Worker loop: receives (policy hash, payload or None, variables, instrument) and runs the policy."""
+    from src.sandbox.executor import SandboxExecutor
+
+    if resource is not None and memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    executor = SandboxExecutor()
+    policies = {}  # policy hash -> code object
+
+    while True:
+        try:
+            policy_hash, payload, context_variables, instrument = conn.recv()
+        except EOFError:
+            return
+        if payload is not None:
+            kind, data = payload
+            policies[policy_hash] = marshal.loads(data) if kind == "bytecode" else data
+        if resource is not None and cpu_seconds:
+            _set_cpu_limit(cpu_seconds)
+
+        try:
+            execution = executor._execute_local(policies[policy_hash], context_variables, instrument=instrument)
+            execution["outputs"] = {
+                name: value for name, value in execution["outputs"].items() if isinstance(value, RETURNED_TYPES)
+            }
+        except MemoryError:
+            execution = {"success": False, "result": None, "outputs": {}, "stdout": "",
+                         "error": f"MemoryError: policy exceeded the {memory_mb} MB memory limit"}
+        try:
+            conn.send(execution)
+        except Exception as e:
+            # e.g. a result value that cannot be pickled
+            conn.send({"success": False, "result": None, "outputs": {}, "stdout": "",
+                       "error": f"Could not return execution result: {e}"})
+
+
+class _Worker:
+    def __init__(self, context, cpu_seconds, memory_mb):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, cpu_seconds, memory_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.policies = set()  # hashes already shipped to this worker
+        self.tasks = 0
+
+    def stop(self):
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+
+
+class ProcessSandboxPool:
+    """
+    Pool of warm worker processes for isolated policy execution.
+
+    Each worker runs a SandboxExecutor under rlimit caps on CPU time (per
+    execution) and address space; the parent enforces a wall-clock timeout and
+    kills and replaces a worker that overruns, crashes or hits a limit. Workers are
+    also recycled after max_tasks_per_worker executions.
+
+    A policy is shipped to a worker once (source, or marshalled bytecode for code
+    objects) and referenced by hash afterwards.
+    """
+
+    def __init__(self, workers=POOL_WORKERS, cpu_seconds=CPU_SECONDS, memory_mb=MEMORY_MB,
+                 timeout_s=TIMEOUT_S, max_tasks_per_worker=MAX_TASKS_PER_WORKER):
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.timeout_s = timeout_s
+        self.max_tasks_per_worker = max_tasks_per_worker
+        # forkserver: workers are forked from a clean server process, not from a
+        # (possibly multi-threaded) web worker
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.executions = 0
+        self.recycled = 0
+        self.timeouts = 0
+        for _ in range(workers):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        return _Worker(self._context, self.cpu_seconds, self.memory_mb)
+
+    def _replace(self, worker):
+        worker.stop()
+        with self._lock:
+            self.recycled += 1
+        return self._spawn()
+
+    @staticmethod
+    def _payload(code):
+        if isinstance(code, str):
+            data = code
+            kind = "source"
+            digest = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        else:
+            data = marshal.dumps(code)
+            kind = "bytecode"
+            digest = hashlib.sha256(data).hexdigest()
+        return digest, (kind, data)
+
+    def execute(self, code, context_variables={}, instrument=False):
+        """
+        Runs a policy in a worker process.
+
+        Args:
+            instrument (bool): Measure the run in the worker (see metrics.measure). When the
+                               worker is killed, only the parent's wall time is reported.
+
+        Returns:
+            dict: Same shape as SandboxExecutor.execute; 'outputs' holds only plain data.
+        """
+        if self._closed:
+            raise RuntimeError("ProcessSandboxPool is closed")
+        policy_hash, payload = self._payload(code)
+        worker = self._idle.get()
+        try:
+            ship = payload if policy_hash not in worker.policies else None
+            try:
+                started = time.perf_counter()
+                worker.conn.send((policy_hash, ship, context_variables, instrument))
+                ready = worker.conn.poll(self.timeout_s)
+                execution = worker.conn.recv() if ready else None
+            except (EOFError, OSError, BrokenPipeError):
+                execution, ready = None, True
+
+            if execution is None:
+                worker.process.join(timeout=0.1)
+                if not ready:
+                    with self._lock:
+                        self.timeouts += 1
+                    error = f"TimeoutError: policy exceeded the {self.timeout_s}s wall-clock limit"
+                elif worker.process.exitcode == -getattr(signal, "SIGXCPU", 0):
+                    error = f"CPU time limit exceeded ({self.cpu_seconds}s)"
+                else:
+                    error = f"Sandbox worker died (exit code {worker.process.exitcode})"
+                worker = self._replace(worker)
+                execution = {"success": False, "result": None, "outputs": {}, "stdout": "", "error": error}
+                if instrument:
+                    execution["metrics"] = {"wall_ms": (time.perf_counter() - started) * 1000}
+                return execution
+
+            worker.policies.add(policy_hash)
+            worker.tasks += 1
+            with self._lock:
+                self.executions += 1
+            if worker.tasks >= self.max_tasks_per_worker:
+                worker = self._replace(worker)
+            return execution
+        finally:
+            self._idle.put(worker)
+
+    def stats(self):
+        return {
+            "idle_workers": self._idle.qsize(),
+            "executions": self.executions,
+            "timeouts": self.timeouts,
+            "recycled": self.recycled
+        }
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def shared_pool():
+    """Process-wide pool with the default limits, started on first use."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ProcessSandboxPool()
+        return _shared_pool
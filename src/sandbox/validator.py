@@ -0,0 +1,246 @@
+import ast
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Verification results kept per validator (LRU, keyed by source hash)
+VERIFIED_CACHE_SIZE = 1024
+
+# Statements and expressions a policy may contain. Left out, among others: import,
+# global/nonlocal, with, function/lambda/class definitions (so no recursion), del,
+# yield/await and while loops.
+ALLOWED_NODES = (
+    ast.Module, ast.Expr, ast.Assign, ast.AugAssign, ast.AnnAssign, ast.If, ast.For,
+    ast.Break, ast.Continue, ast.Pass, ast.Try, ast.ExceptHandler, ast.NamedExpr,
+    ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Compare, ast.IfExp, ast.Call, ast.keyword,
+    ast.Name, ast.Constant, ast.Attribute, ast.Subscript, ast.Slice, ast.Starred,
+    ast.List, ast.Tuple, ast.Dict, ast.Set, ast.ListComp, ast.SetComp, ast.DictComp,
+    ast.GeneratorExp, ast.comprehension, ast.JoinedStr, ast.FormattedValue,
+    ast.Load, ast.Store,
+    ast.And, ast.Or, ast.Not, ast.Invert, ast.UAdd, ast.USub,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.BitAnd, ast.BitOr, ast.BitXor, ast.LShift, ast.RShift,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Is, ast.IsNot
+)
+
+# Attribute names a policy may access, on any object. Frame, code and generator
+# attributes (gi_frame, f_globals, ...), str.format (which resolves attributes
+# inside the format string) and math.factorial/comb/perm (unbounded CPU on large
+# ints) are deliberately absent.
+ALLOWED_ATTRIBUTES = frozenset([
+    # dict / list / str methods
+    "get", "keys", "values", "items", "copy", "append", "extend", "count", "index", "find",
+    "lower", "upper", "strip", "lstrip", "rstrip", "startswith", "endswith", "split", "join",
+    "replace", "isdigit", "isnumeric", "isalpha", "title", "capitalize",
+    # json
+    "dumps", "loads",
+    # datetime
+    "date", "datetime", "timedelta", "timezone", "now", "today", "utcnow", "fromisoformat",
+    "strptime", "strftime", "isoformat", "year", "month", "day", "hour", "minute", "second",
+    "days", "seconds", "total_seconds", "weekday",
+] + [name for name in dir(math) if not name.startswith("_") and name not in ("factorial", "comb", "perm")])
+
+# Input variables a policy may read besides the executor's namespace
+INPUT_NAMES = ("scenario",)
+
+# Verified policies run in-process without rlimits, and a single C-level operation
+# (10**10**9, 'a' * 10**10) cannot be interrupted, so expressions that can blow up
+# are bounded statically:
+MAX_EXPONENT = 16                # constant right operand of ** and <<
+MAX_FACTOR = 10000               # int constant operand of *
+MAX_RANGE = 10000                # literal range() bounds
+MAX_LOOP_ITERATIONS = 1000000    # product of literal range() sizes over nested loops
+
+# Literal sequences; multiplying one repeats it
+SEQUENCE_NODES = (ast.List, ast.Tuple, ast.ListComp, ast.JoinedStr)
+
+# Methods that grow a list in place
+GROWING_METHODS = ("append", "extend", "insert")
+
+
+def _is_small_number(node, limit):
+    return isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+        and not isinstance(node.value, bool) and abs(node.value) <= limit
+
+
+def _range_size(node):
+    """Iterations of a literal range(...) call, 1 for any other iterable (data-bounded)."""
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "range" \
+            and node.args and all(_is_small_number(arg, MAX_RANGE) for arg in node.args):
+        try:
+            return len(range(*[int(arg.value) for arg in node.args]))
+        except (TypeError, ValueError):
+            return 1
+    return 1
+
+
+def _growth_violations(node):
+    """
+    Expression-level blow-ups: large or computed exponents and shifts, repeated literal
+    sequences, unbounded range(), and * by a power or a large int constant (which
+    repeats any sequence operand, literal or not).
+    """
+    if isinstance(node, (ast.BinOp, ast.AugAssign)):
+        left, right = (node.left, node.right) if isinstance(node, ast.BinOp) else (node.target, node.value)
+    if isinstance(node, (ast.BinOp, ast.AugAssign)) and isinstance(node.op, (ast.Pow, ast.LShift)):
+        if not _is_small_number(right, MAX_EXPONENT):
+            return f"line {node.lineno}: exponent/shift must be a constant <= {MAX_EXPONENT}"
+        if isinstance(left, ast.BinOp) and isinstance(left.op, (ast.Pow, ast.LShift)):
+            return f"line {node.lineno}: nested exponent/shift not allowed"
+    if isinstance(node, (ast.BinOp, ast.AugAssign)) and isinstance(node.op, ast.Mult):
+        for operand in (left, right):
+            if isinstance(operand, SEQUENCE_NODES) or \
+                    (isinstance(operand, ast.Constant) and isinstance(operand.value, (str, bytes))):
+                return f"line {node.lineno}: sequence repetition not allowed"
+            if isinstance(operand, ast.BinOp) and isinstance(operand.op, ast.Pow):
+                return f"line {node.lineno}: multiplying by a power not allowed"
+            if isinstance(operand, ast.Constant) and isinstance(operand.value, int) \
+                    and not _is_small_number(operand, MAX_FACTOR):
+                return f"line {node.lineno}: int factor must be <= {MAX_FACTOR}"
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "range":
+        for arg in node.args:
+            is_len = isinstance(arg, ast.Call) and isinstance(arg.func, ast.Name) and arg.func.id == "len"
+            if not (is_len or (_is_small_number(arg, MAX_RANGE) and isinstance(arg.value, int))):
+                return f"line {node.lineno}: range() bounds must be int literals <= {MAX_RANGE} or len(...)"
+    return None
+
+
+def _grows_iterated(iterated, body):
+    """True if body appends to, extends or += the sequence being iterated (a loop that never ends)."""
+    target = ast.dump(iterated)
+    for statement in body:
+        for node in ast.walk(statement):
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) \
+                    and node.func.attr in GROWING_METHODS and ast.dump(node.func.value) == target:
+                return True
+            if isinstance(node, ast.AugAssign) and ast.dump(node.target).replace("Store()", "Load()") == target:
+                return True
+    return False
+
+
+def _loop_violations(node, iterations=1):
+    """
+    Nested loops over literal ranges whose combined iterations exceed MAX_LOOP_ITERATIONS,
+    and loops that grow the sequence they iterate.
+    """
+    found = []
+    if isinstance(node, ast.For):
+        iterations *= _range_size(node.iter)
+        if _grows_iterated(node.iter, node.body):
+            found.append(f"line {node.lineno}: loop grows the sequence it iterates")
+    elif isinstance(node, (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+        parts = [node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]
+        for generator in node.generators:
+            iterations *= _range_size(generator.iter)
+            if _grows_iterated(generator.iter, parts + generator.ifs):
+                found.append(f"line {node.lineno}: comprehension grows the sequence it iterates")
+    if iterations > MAX_LOOP_ITERATIONS:
+        return found + [f"line {node.lineno}: nested loops run {iterations} iterations (> {MAX_LOOP_ITERATIONS})"]
+    for child in ast.iter_child_nodes(node):
+        found.extend(_loop_violations(child, iterations))
+    return found
+
+
+class PolicyValidator:
+    """
+    Static (AST) verification of policy source before it runs in-process.
+
+    A policy passes when every node type is in ALLOWED_NODES, every attribute access
+    is in ALLOWED_ATTRIBUTES, no name is a dunder, and every name it reads is either
+    allowed (the executor's builtins and modules, INPUT_NAMES) or bound by the policy
+    itself. Results are cached by source hash, so a policy is parsed once.
+
+    Because verified policies run in-process without rlimits, expressions that can blow
+    up in one uninterruptible step are rejected too: ** and << need a small constant
+    right operand, * takes neither a power nor an int constant above MAX_FACTOR and
+    literal sequences cannot be multiplied, range() takes small int literals or
+    len(...), nested literal ranges are capped at MAX_LOOP_ITERATIONS, and a loop may
+    not grow the sequence it iterates. Policies cannot define functions or lambdas, so
+    they cannot recurse. Growth spread over many statements (a = a * a repeated, or a
+    large number bound to a name and then used as a factor) is not bounded; policies
+    of untrusted origin still belong in the isolated process pool.
+    """
+
+    def __init__(self, allowed_names=(), input_names=INPUT_NAMES, cache_size=VERIFIED_CACHE_SIZE):
+        self.allowed_names = frozenset(allowed_names) | frozenset(input_names)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # sha256(source) -> None (verified) or the first violation
+        self._lock = threading.Lock()
+        self.verified = 0
+        self.rejected = 0
+        self.cache_hits = 0
+
+    def violations(self, source):
+        """
+        Returns:
+            list: Human-readable violations; empty if the policy is verified.
+        """
+        try:
+            tree = ast.parse(source)
+        except SyntaxError as e:
+            return [f"syntax error: {e}"]
+
+        found = []
+        bound = set()
+        loaded = []
+        for node in ast.walk(tree):
+            growth = _growth_violations(node)
+            if growth:
+                found.append(growth)
+            if not isinstance(node, ALLOWED_NODES):
+                found.append(f"line {getattr(node, 'lineno', '?')}: {type(node).__name__} not allowed")
+            elif isinstance(node, ast.Attribute) and node.attr not in ALLOWED_ATTRIBUTES:
+                found.append(f"line {node.lineno}: attribute '{node.attr}' not allowed")
+            elif isinstance(node, ast.Name):
+                if node.id.startswith("__"):
+                    found.append(f"line {node.lineno}: name '{node.id}' not allowed")
+                elif isinstance(node.ctx, ast.Store):
+                    bound.add(node.id)
+                else:
+                    loaded.append(node)
+            elif isinstance(node, ast.ExceptHandler) and node.name:
+                bound.add(node.name)
+
+        for node in loaded:
+            if node.id not in bound and node.id not in self.allowed_names:
+                found.append(f"line {node.lineno}: unknown name '{node.id}'")
+        found.extend(_loop_violations(tree))
+        return found
+
+    def check(self, source):
+        """
+        Verifies source, using the cache when this exact source was checked before.
+
+        Returns:
+            str: None if the policy is verified, else the first violation.
+        """
+        key = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return self._cache[key]
+
+        found = self.violations(source)
+        violation = found[0] if found else None
+        with self._lock:
+            if violation is None:
+                self.verified += 1
+            else:
+                self.rejected += 1
+            self._cache[key] = violation
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return violation
+
+    def is_verified(self, source):
+        return self.check(source) is None
+
+    def stats(self):
+        return {
+            "cached": len(self._cache),
+            "verified": self.verified,
+            "rejected": self.rejected,
+            "cache_hits": self.cache_hits
+        }
@@ -1,43 +1,68 @@
+import hmac
 import json
+import hashlib
+from jose import jws
+from jose.constants import ALGORITHMS
+from jose.utils import base64url_encode, base64url_decode
 from src.security.agent_card import AgentCardManager
 
+# Same bytes python-jose produces for an HS256 header, so tokens from either side verify
+JWS_HEADER = base64url_encode(json.dumps({"alg": ALGORITHMS.HS256, "typ": "JWT"},
+                                         separators=(",", ":"), sort_keys=True).encode("utf-8"))
+
+
+def canonical_json(value):
+    """Compact JSON with sorted keys: one serialization per message, stable across runs."""
+    return json.dumps(value, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
 class MessageSigner:
+    """
+    Signs and verifies agent messages as compact HS256 JWS tokens.
+
+    The payload is {"iss": agent_name, "msg": message}. Each message is serialized
+    once (canonical_json) and signed once; the HMAC key is prepared at construction
+    and copied per operation instead of being re-keyed. Tokens are standard JWS and
+    interoperate with jose.jws.
+    """
+
     def __init__(self, agent_name, secret_key=None):
         self.card_manager = AgentCardManager(agent_name, private_key=secret_key)
+        self._mac = hmac.new(self.card_manager.secret.encode("utf-8"), digestmod=hashlib.sha256)
+
+    def _signature(self, signing_input):
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return mac.digest()
 
     def sign_message(self, message_dict):
         """
         Wraps a message payload in a JWS signature.
         """
-        # We treat the whole message dict as the payload
-        signed_token = self.card_manager.create_agent_card(
-            capabilities=[], # Not used for message signing, just reusing the JWS logic
-            description=json.dumps(message_dict) # Embedding message in description field is a hack for this demo class
-            # In a real implementation, we'd use a proper JWS payload structure: { "msg": ... }
-        )
-        
-        # Let's do it properly with the underlying library if possible, 
-        # but reusing the manager is faster for this prototype.
-        # Actually, let's just use the manager's key to sign a custom payload.
-        
         payload = {
             "iss": self.card_manager.agent_name,
             "msg": message_dict
         }
-        # We access the internal secret (in prod use a proper signer class)
-        from jose import jws, constants
-        signed = jws.sign(payload, self.card_manager.secret, algorithm=constants.ALGORITHMS.HS256)
-        return signed
+        signing_input = JWS_HEADER + b"." + base64url_encode(canonical_json(payload))
+        return (signing_input + b"." + base64url_encode(self._signature(signing_input))).decode("utf-8")
 
     def verify_message(self, signed_message):
         """
         Verifies JWS and returns the original message dict.
         """
-        from jose import jws, constants
         try:
             # In a real system, we'd look up the sender's public key based on 'iss' header.
             # Here we assume shared secret for demo simplicity.
-            payload = jws.verify(signed_message, self.card_manager.secret, algorithms=[constants.ALGORITHMS.HS256])
+            token = signed_message.encode("utf-8") if isinstance(signed_message, str) else signed_message
+            signing_input, _, signature = token.rpartition(b".")
+            header, _, claims = signing_input.partition(b".")
+            if header != JWS_HEADER:
+                # Some other header (e.g. extra fields): let jose validate it
+                payload = jws.verify(signed_message, self.card_manager.secret, algorithms=[ALGORITHMS.HS256])
+            elif hmac.compare_digest(self._signature(signing_input), base64url_decode(signature)):
+                payload = base64url_decode(claims)
+            else:
+                raise ValueError("Signature verification failed.")
             data = json.loads(payload)
             return data['msg']
         except Exception as e:
@@ -0,0 +1,150 @@
+from src.tools.lexical_index import tokenize
+
+# Rough tokens-per-character ratio for English regulatory text (Gemini/SentencePiece
+# average ~4 characters per token); good enough for budgeting, not for billing.
+CHARS_PER_TOKEN = 4
+
+# Word n-gram size used to detect overlapping chunks
+SHINGLE_SIZE = 5
+
+# Chunks the agent used to join into the prompt unfiltered (the Librarian's default
+# n_results); tokens_saved is measured against that
+BASELINE_CHUNKS = 3
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text, tokens):
+    """Cuts text to about `tokens` estimated tokens, at a word boundary when there is one."""
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    boundary = cut.rfind(" ")
+    return cut[:boundary] if boundary > 0 else cut
+
+
+def _shingles(tokens):
+    if len(tokens) < SHINGLE_SIZE:
+        return {tuple(tokens)}
+    return {tuple(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+class ContextBuilder:
+    """
+    Builds the REGULATIONS section of the policy prompt from retrieved chunks.
+
+    1. De-duplicates: a chunk whose word 5-grams are mostly contained in a
+       better-ranked chunk (the same paragraph indexed twice, overlapping
+       sections, one document ingested per jurisdiction) is dropped.
+    2. Reranks: chunks are ordered by how many query / scenario-field terms they
+       contain, with the retrieval rank as tie-breaker.
+    3. Cuts to token_budget: chunks are taken in reranked order while they fit;
+       the kept chunks are emitted in that order. If not even one fits, the
+       best-ranked chunk is truncated to the budget rather than sending none.
+    """
+
+    def __init__(self, token_budget=1024, duplicate_threshold=0.8):
+        """
+        Args:
+            token_budget (int): Maximum estimated tokens of regulation context per prompt.
+            duplicate_threshold (float): Fraction of a chunk's 5-grams found in a kept
+                                         chunk above which it counts as a duplicate.
+        """
+        self.token_budget = token_budget
+        self.duplicate_threshold = duplicate_threshold
+
+        # Running totals for stats()
+        self.prompts_built = 0
+        self.tokens_in = 0
+        self.tokens_baseline = 0
+        self.tokens_out = 0
+
+    def _deduplicate(self, documents):
+        kept = []  # (index, shingles)
+        for i, text in enumerate(documents):
+            shingles = _shingles(tokenize(text))
+            if not shingles:
+                continue
+            if any(len(shingles & other) / len(shingles) >= self.duplicate_threshold for _, other in kept):
+                continue
+            kept.append((i, shingles))
+        return [i for i, _ in kept]
+
+    def _rerank(self, documents, indices, terms):
+        def score(i):
+            tokens = set(tokenize(documents[i]))
+            return len(terms & tokens)
+        # sorted() is stable, so equal scores keep the retrieval order
+        return sorted(indices, key=score, reverse=True)
+
+    def build(self, documents, query, field_names=()):
+        """
+        Args:
+            documents (list): Retrieved chunk texts, best retrieval match first.
+            query (str): The retrieval query.
+            field_names (iterable): Scenario field names, e.g. "ambient_temperature_c";
+                                    their words count as relevance terms.
+
+        Returns:
+            dict: {'text', 'chunks_in', 'chunks_kept', 'duplicates_dropped', 'truncated',
+                   'tokens_in', 'tokens_baseline', 'tokens_out', 'tokens_saved'};
+                   tokens_in is what joining every retrieved chunk would have cost,
+                   tokens_baseline what joining the first BASELINE_CHUNKS did, and
+                   tokens_saved is relative to the baseline.
+        """
+        terms = set(tokenize(query))
+        for name in field_names:
+            terms.update(tokenize(name.replace("_", " ")))
+
+        unique = self._deduplicate(documents)
+        ranked = self._rerank(documents, unique, terms)
+        selected, used = [], 0
+        for i in ranked:
+            cost = estimate_tokens(documents[i])
+            if used + cost > self.token_budget:
+                continue
+            selected.append(i)
+            used += cost
+
+        truncated = not selected and bool(ranked)
+        if truncated:
+            selected = ranked[:1]
+            text = truncate_to_tokens(documents[ranked[0]], self.token_budget)
+        else:
+            text = "\n".join(documents[i] for i in selected) if selected else "No regulations found."
+        tokens_in = estimate_tokens("\n".join(documents))
+        tokens_baseline = estimate_tokens("\n".join(documents[:BASELINE_CHUNKS]))
+        tokens_out = estimate_tokens(text)
+
+        self.prompts_built += 1
+        self.tokens_in += tokens_in
+        self.tokens_baseline += tokens_baseline
+        self.tokens_out += tokens_out
+        return {
+            "text": text,
+            "chunks_in": len(documents),
+            "chunks_kept": len(selected),
+            "duplicates_dropped": len(documents) - len(unique),
+            "truncated": truncated,
+            "tokens_in": tokens_in,
+            "tokens_baseline": tokens_baseline,
+            "tokens_out": tokens_out,
+            "tokens_saved": max(0, tokens_baseline - tokens_out)
+        }
+
+    def stats(self):
+        """
+        Returns:
+            dict: Prompts built and estimated context tokens in / baseline / out / saved
+                  (against the baseline) since construction.
+        """
+        return {
+            "prompts_built": self.prompts_built,
+            "tokens_in": self.tokens_in,
+            "tokens_baseline": self.tokens_baseline,
+            "tokens_out": self.tokens_out,
+            "tokens_saved": max(0, self.tokens_baseline - self.tokens_out)
+        }
@@ -0,0 +1,164 @@
+import os
+import time
+import numpy as np
+from chromadb.utils import embedding_functions
+from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+
+# Embedding backends selectable through Librarian(embedding_backend=...)
+EMBEDDING_BACKENDS = ("sentence-transformers", "onnx", "onnx-int8")
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+class OnnxEmbeddingFunction(ONNXMiniLM_L6_V2):
+    """
+    CPU-optimized all-MiniLM-L6-v2 running on onnxruntime.
+
+    Uses the same exported ONNX model Chroma ships (same weights as the
+    sentence-transformers model, so vectors stay compatible with existing
+    collections), with three changes over the stock Chroma function:
+      - optional dynamic int8 weight quantization, cached next to the model
+      - dynamic batching: texts are sorted by token length and padded only to
+        the longest text in their batch instead of a fixed 256 tokens
+      - explicit intra-op thread count for shared CPU-only nodes
+    """
+
+    def __init__(self, quantize=False, num_threads=None, max_batch_size=32, max_batch_tokens=8192):
+        """
+        Args:
+            quantize (bool): Run the int8 dynamically quantized model.
+            num_threads (int): onnxruntime intra-op threads (None = onnxruntime default).
+            max_batch_size (int): Upper bound on texts per forward pass.
+            max_batch_tokens (int): Upper bound on padded tokens per forward pass.
+        """
+        super().__init__(preferred_providers=["CPUExecutionProvider"])
+        self.quantize = quantize
+        self.num_threads = num_threads
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+
+        # Running totals for throughput()
+        self.sentences_embedded = 0
+        self.seconds_embedding = 0.0
+
+    @property
+    def model_dir(self):
+        return os.path.join(self.DOWNLOAD_PATH, self.EXTRACTED_FOLDER_NAME)
+
+    def _model_path(self):
+        fp32_path = os.path.join(self.model_dir, "model.onnx")
+        if not self.quantize:
+            return fp32_path
+
+        int8_path = os.path.join(self.model_dir, "model_int8.onnx")
+        if not os.path.exists(int8_path):
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            print(f"Quantizing {MODEL_NAME} to int8 (one-time)...")
+            quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        return int8_path
+
+    @property
+    def model(self):
+        if getattr(self, "_session", None) is None:
+            self._download_model_if_not_exists()
+            so = self.ort.SessionOptions()
+            so.log_severity_level = 3
+            so.graph_optimization_level = self.ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self.num_threads:
+                so.intra_op_num_threads = self.num_threads
+                so.inter_op_num_threads = 1
+            self._session = self.ort.InferenceSession(
+                self._model_path(),
+                providers=self._preferred_providers,
+                sess_options=so
+            )
+        return self._session
+
+    @property
+    def tokenizer(self):
+        if getattr(self, "_tokenizer", None) is None:
+            self._download_model_if_not_exists()
+            tokenizer = self.Tokenizer.from_file(os.path.join(self.model_dir, "tokenizer.json"))
+            tokenizer.enable_truncation(max_length=self.max_tokens())
+            tokenizer.no_padding()
+            self._tokenizer = tokenizer
+        return self._tokenizer
+
+    def _batches(self, encoded):
+        """Yields lists of indices into encoded, grouped by similar length."""
+        order = sorted(range(len(encoded)), key=lambda i: len(encoded[i].ids))
+        batch = []
+        for i in order:
+            longest = len(encoded[i].ids)  # order is ascending, so the newest item is the longest
+            if batch and (len(batch) >= self.max_batch_size or longest * (len(batch) + 1) > self.max_batch_tokens):
+                yield batch
+                batch = []
+            batch.append(i)
+        if batch:
+            yield batch
+
+    def _forward(self, documents, batch_size=None):
+        encoded = self.tokenizer.encode_batch(list(documents))
+        embeddings = np.zeros((len(documents), 384), dtype=np.float32)
+
+        for batch in self._batches(encoded):
+            width = max(len(encoded[i].ids) for i in batch)
+            input_ids = np.zeros((len(batch), width), dtype=np.int64)
+            attention_mask = np.zeros((len(batch), width), dtype=np.int64)
+            for row, i in enumerate(batch):
+                ids = encoded[i].ids
+                input_ids[row, :len(ids)] = ids
+                attention_mask[row, :len(ids)] = 1
+
+            last_hidden_state = self.model.run(None, {
+                "input_ids": input_ids,
+                "attention_mask": attention_mask,
+                "token_type_ids": np.zeros_like(input_ids)
+            })[0]
+
+            # Mean pooling over real (non-padding) tokens
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (last_hidden_state * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            embeddings[batch] = self._normalize(pooled)
+
+        return embeddings
+
+    def __call__(self, input):
+        if not input:
+            return []
+        start = time.perf_counter()
+        embeddings = self._forward(input)
+        self.seconds_embedding += time.perf_counter() - start
+        self.sentences_embedded += len(input)
+        return [embedding for embedding in embeddings]
+
+    def throughput(self):
+        """
+        Returns:
+            dict: {'sentences', 'seconds', 'sentences_per_second'} since construction.
+        """
+        rate = self.sentences_embedded / self.seconds_embedding if self.seconds_embedding else 0.0
+        return {
+            "sentences": self.sentences_embedded,
+            "seconds": self.seconds_embedding,
+            "sentences_per_second": rate
+        }
+
+
+def create_embedding_function(backend="sentence-transformers", num_threads=None, max_batch_size=32):
+    """
+    Builds the embedding function selected by name.
+
+    Args:
+        backend (str): "sentence-transformers" (PyTorch fp32), "onnx" (onnxruntime fp32)
+                       or "onnx-int8" (onnxruntime, dynamically quantized).
+        num_threads (int): CPU threads for the onnx backends.
+        max_batch_size (int): Texts per forward pass for the onnx backends.
+    """
+    if backend == "sentence-transformers":
+        return embedding_functions.SentenceTransformerEmbeddingFunction(model_name=MODEL_NAME)
+    if backend == "onnx":
+        return OnnxEmbeddingFunction(quantize=False, num_threads=num_threads, max_batch_size=max_batch_size)
+    if backend == "onnx-int8":
+        return OnnxEmbeddingFunction(quantize=True, num_threads=num_threads, max_batch_size=max_batch_size)
+    raise ValueError(f"Unknown embedding backend: {backend}. Expected one of {EMBEDDING_BACKENDS}")
@@ -0,0 +1,124 @@
+import os
+import re
+import json
+import math
+from collections import defaultdict
+
+# Tokens keep the punctuation that makes regulatory terms exact, e.g.
+# "Type B(U)" -> ["type", "b(u)"], "4 Bq/cm2" -> ["4", "bq/cm2"].
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[./()][a-z0-9]+)*\)?")
+
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        # Drop a closing paren that has no matching opener ("(ti)" -> "ti")
+        if token.endswith(")") and "(" not in token:
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over the same chunks that live in ChromaDB.
+    Persisted as a single JSON file so it survives restarts without re-ingesting.
+    """
+
+    def __init__(self, index_path, k1=1.5, b=0.75):
+        self.index_path = index_path
+        self.k1 = k1
+        self.b = b
+
+        self.postings = defaultdict(dict)  # term -> {chunk_id: term frequency}
+        self.doc_lengths = {}              # chunk_id -> number of tokens
+        self.documents = {}                # chunk_id -> chunk text
+        self.metadatas = {}                # chunk_id -> chunk metadata
+        self.total_length = 0
+
+        if os.path.exists(self.index_path):
+            self.load()
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, documents, metadatas, ids):
+        """
+        Adds (or replaces) chunks in the index.
+        """
+        for doc_id, text, metadata in zip(ids, documents, metadatas):
+            if doc_id in self.doc_lengths:
+                self._remove(doc_id)
+
+            tokens = tokenize(text)
+            term_counts = defaultdict(int)
+            for token in tokens:
+                term_counts[token] += 1
+            for term, count in term_counts.items():
+                self.postings[term][doc_id] = count
+
+            self.doc_lengths[doc_id] = len(tokens)
+            self.total_length += len(tokens)
+            self.documents[doc_id] = text
+            self.metadatas[doc_id] = metadata
+
+    def _remove(self, doc_id):
+        for term in set(tokenize(self.documents[doc_id])):
+            self.postings[term].pop(doc_id, None)
+            if not self.postings[term]:
+                del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        self.documents.pop(doc_id, None)
+        self.metadatas.pop(doc_id, None)
+
+    def search(self, query_text, n_results=3):
+        """
+        Scores chunks with BM25 and returns the top n_results.
+
+        Returns:
+            list: [(chunk_id, score), ...] sorted by descending score.
+        """
+        n_docs = len(self.doc_lengths)
+        if n_docs == 0:
+            return []
+
+        avg_length = self.total_length / n_docs
+        scores = defaultdict(float)
+
+        for term in set(tokenize(query_text)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:n_results]
+
+    def save(self):
+        data = {
+            "k1": self.k1,
+            "b": self.b,
+            "postings": self.postings,
+            "doc_lengths": self.doc_lengths,
+            "documents": self.documents,
+            "metadatas": self.metadatas
+        }
+        # Write to a temp file first so a crash never leaves a half-written index
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.index_path)
+
+    def load(self):
+        with open(self.index_path, 'r') as f:
+            data = json.load(f)
+        self.k1 = data.get("k1", self.k1)
+        self.b = data.get("b", self.b)
+        self.postings = defaultdict(dict, data["postings"])
+        self.doc_lengths = data["doc_lengths"]
+        self.documents = data["documents"]
+        self.metadatas = data["metadatas"]
+        self.total_length = sum(self.doc_lengths.values())
@@ -1,8 +1,13 @@
 import os
-import chromadb
-from chromadb.utils import embedding_functions
+import json
+import time
+import hashlib
+from collections import deque
 from pypdf import PdfReader
 import google.generativeai as genai
+from src.tools.lexical_index import LexicalIndex
+from src.tools.vector_store import create_vector_store, ShardedVectorStore
+from src.tools.embeddings import create_embedding_function
 
 # Configure Gemini API (Assuming GOOGLE_API_KEY is in env)
 # If not, we might need to ask the user or use a placeholder.
@@ -10,29 +15,127 @@ import google.generativeai as genai
 # if Gemini is not set, to ensure it runs in the Kaggle/Local env without friction initially.
 # But ideally we use Gemini embeddings.
 
+# Retrieval modes accepted by Librarian.query
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+
+# Latency samples kept per mode for latency_report()
+LATENCY_WINDOW = 1000
+
+# Reciprocal Rank Fusion constant (Cormack et al.); 60 is the usual default
+RRF_K = 60
+
 class Librarian:
-    def __init__(self, db_path="data/chroma_db"):
-        self.client = chromadb.PersistentClient(path=db_path)
+    def __init__(self, db_path="data/chroma_db", vector_backend="chroma", vector_dtype="float32",
+                 embedding_backend="sentence-transformers", embedding_threads=None,
+                 shard_by=None, shard_timeout_s=2.0, shard_workers=8, hnsw_config=None, warm_up=False):
+        """
+        Args:
+            db_path (str): Directory holding the vector store and lexical index.
+            vector_backend (str): "chroma" (default) or "numpy" (brute-force, for small corpora).
+            vector_dtype (str): Storage dtype for the numpy backend: "float32", "float16" or "int8".
+            embedding_backend (str): "sentence-transformers" (default), "onnx" or "onnx-int8".
+            embedding_threads (int): CPU threads for the onnx embedding backends.
+            shard_by (str): None for a single collection, or "jurisdiction"/"source" to
+                            keep one collection per shard and fan queries out in parallel.
+            shard_timeout_s (float): Per-query wait for shard results before skipping slow shards.
+            shard_workers (int): Thread pool size for shard fan-out.
+            hnsw_config (dict): Chroma HNSW parameters: "M" and "ef_construction" (applied when a
+                                collection is created) and "ef_search" (applied on every start).
+            warm_up (bool): Preload the embedding model and on-disk index during construction.
+        """
+        self.db_path = db_path
         
         # Use a default embedding function (all-MiniLM-L6-v2) which is free and local
         # This avoids API key issues for the basic setup. 
         # We can switch to GoogleGenerativeAIEmbeddingFunction later.
-        self.embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+        # The onnx backends run the same model through onnxruntime (optionally int8) on CPU.
+        self.embedding_fn = create_embedding_function(embedding_backend, num_threads=embedding_threads)
         
-        self.collection = self.client.get_or_create_collection(
-            name="hazmat_regulations",
-            embedding_function=self.embedding_fn
-        )
+        if shard_by:
+            self.store = ShardedVectorStore(
+                db_path,
+                self.embedding_fn,
+                shard_factory=lambda name: create_vector_store(
+                    vector_backend, db_path, self.embedding_fn, collection_name=name, dtype=vector_dtype,
+                    hnsw_config=hnsw_config
+                ),
+                shard_by=shard_by,
+                collection_name="hazmat_regulations",
+                shard_timeout_s=shard_timeout_s,
+                max_workers=shard_workers
+            )
+        else:
+            self.store = create_vector_store(
+                vector_backend,
+                db_path,
+                self.embedding_fn,
+                collection_name="hazmat_regulations",
+                dtype=vector_dtype,
+                hnsw_config=hnsw_config
+            )
 
-    def ingest_pdf(self, pdf_path):
-        print(f"Ingesting {pdf_path}...")
-        reader = PdfReader(pdf_path)
-        text_chunks = []
-        metadatas = []
-        ids = []
+        # BM25 index over the same chunks, stored next to the vector store.
+        # Exact-term queries ("Type B(U)", "Bq/cm2") can skip the transformer entirely.
+        self.lexical_index = LexicalIndex(os.path.join(db_path, "lexical_index.json"))
+        self._corpus_version = None
+        if len(self.lexical_index) == 0 and self.store.count() > 0:
+            self._rebuild_lexical_index()
+
+        # Per-mode query latencies in milliseconds, see latency_report()
+        self.latencies_ms = {mode: deque(maxlen=LATENCY_WINDOW) for mode in RETRIEVAL_MODES}
+
+        if warm_up:
+            self.warm_up()
+
+    def warm_up(self):
+        """
+        Pays the cold-start costs up front instead of on the first compliance check:
+        loads the embedding model and pulls the vector index into memory.
+
+        Returns:
+            dict: Seconds spent on each step.
+        """
+        timings = {}
+        start = time.perf_counter()
+        self.embedding_fn(["warm-up"])
+        timings["embedding_model_s"] = time.perf_counter() - start
 
-        for i, page in enumerate(reader.pages):
-            text = page.extract_text()
+        start = time.perf_counter()
+        self.store.warm_up()
+        timings["vector_index_s"] = time.perf_counter() - start
+
+        print(f"Librarian warm-up: {timings}")
+        return timings
+
+    def recall_latency_report(self, queries, ef_values=(10, 20, 50, 100, 200), n_results=10):
+        """
+        Recall@n_results versus mean latency for a range of HNSW ef_search values,
+        measured on the given query texts (chroma backend only).
+
+        Returns:
+            list: [{'ef_search', 'recall', 'avg_latency_ms'}, ...]
+        """
+        if not hasattr(self.store, "recall_latency_report"):
+            raise ValueError("recall_latency_report needs the unsharded chroma backend")
+        query_embeddings = [list(map(float, v)) for v in self.embedding_fn(list(queries))]
+        return self.store.recall_latency_report(query_embeddings, ef_values=ef_values, n_results=n_results)
+
+    def _rebuild_lexical_index(self):
+        """Backfills the lexical index from chunks already in the vector store."""
+        existing = self.store.get(include=["documents", "metadatas"])
+        self.lexical_index.add(existing["documents"], existing["metadatas"], existing["ids"])
+        self.lexical_index.save()
+        self._corpus_version = None
+        print(f"Built lexical index from {len(existing['ids'])} existing chunks.")
+
+    def _iter_chunks(self, pdf_path, start_page=0, jurisdiction=None):
+        """
+        Yields (page, section, chunk_id, text, metadata) one page at a time,
+        so only the current page's text is held in memory.
+        """
+        reader = PdfReader(pdf_path)
+        for i in range(start_page, len(reader.pages)):
+            text = reader.pages[i].extract_text()
             if text:
                 # Simple chunking by paragraph or just page for now
                 # For regulations, paragraph/section based is better.
@@ -41,27 +144,248 @@ class Librarian:
                 for j, para in enumerate(paragraphs):
                     if len(para.strip()) > 20: # Ignore small noise
                         chunk_id = f"{os.path.basename(pdf_path)}_p{i}_s{j}"
-                        text_chunks.append(para.strip())
-                        metadatas.append({"source": pdf_path, "page": i})
-                        ids.append(chunk_id)
+                        if jurisdiction:
+                            # The same document may be indexed once per jurisdiction
+                            chunk_id = f"{jurisdiction}:{chunk_id}"
+                        metadata = {"source": pdf_path, "page": i}
+                        if jurisdiction:
+                            metadata["jurisdiction"] = jurisdiction
+                        yield i, j, chunk_id, para.strip(), metadata
+
+    def ingest_pdf(self, pdf_path, stream=False, window_size=256, jurisdiction=None):
+        """
+        Chunks a PDF and adds it to the vector store and lexical index.
+
+        Args:
+            pdf_path (str): Path of the PDF to ingest.
+            stream (bool): Read page by page and commit every window_size chunks,
+                           checkpointing progress so an interrupted ingest resumes.
+            window_size (int): Chunks per commit in streaming mode.
+            jurisdiction (str): Stored in chunk metadata; the shard key when shard_by="jurisdiction".
+        """
+        if stream:
+            return self._ingest_pdf_streaming(pdf_path, window_size, jurisdiction)
+
+        print(f"Ingesting {pdf_path}...")
+        text_chunks = []
+        metadatas = []
+        ids = []
+
+        for _, _, chunk_id, text, metadata in self._iter_chunks(pdf_path, jurisdiction=jurisdiction):
+            text_chunks.append(text)
+            metadatas.append(metadata)
+            ids.append(chunk_id)
 
         if text_chunks:
-            self.collection.add(
-                documents=text_chunks,
-                metadatas=metadatas,
-                ids=ids
-            )
-            print(f"Added {len(text_chunks)} chunks to ChromaDB.")
+            self._commit_chunks(text_chunks, metadatas, ids)
+            self.lexical_index.save()
+            print(f"Added {len(text_chunks)} chunks to the vector store.")
         else:
             print("No text found in PDF.")
 
-    def query(self, query_text, n_results=3):
-        results = self.collection.query(
+    def _commit_chunks(self, text_chunks, metadatas, ids):
+        self.store.add(
+            documents=text_chunks,
+            metadatas=metadatas,
+            ids=ids
+        )
+        self.lexical_index.add(text_chunks, metadatas, ids)
+        self._corpus_version = None
+
+    def corpus_version(self):
+        """
+        Fingerprint of the indexed regulation corpus (chunk ids and texts). Changes when
+        chunks are added or re-ingested with different text; cached until the next ingest.
+        """
+        if self._corpus_version is None:
+            digest = hashlib.sha256()
+            for doc_id in sorted(self.lexical_index.documents):
+                digest.update(f"{doc_id}\0{self.lexical_index.documents[doc_id]}\0".encode("utf-8"))
+            self._corpus_version = digest.hexdigest()[:16]
+        return self._corpus_version
+
+    def _checkpoint_path(self, pdf_path, jurisdiction=None):
+        name = os.path.basename(pdf_path)
+        if jurisdiction:
+            name = f"{jurisdiction}_{name}"
+        return os.path.join(self.db_path, "ingest_checkpoints", f"{name}.json")
+
+    def _load_checkpoint(self, pdf_path, jurisdiction=None):
+        path = self._checkpoint_path(pdf_path, jurisdiction)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            checkpoint = json.load(f)
+        # A changed file invalidates the checkpoint; chunk positions would no longer line up
+        stat = os.stat(pdf_path)
+        if checkpoint.get("size") != stat.st_size or checkpoint.get("mtime") != stat.st_mtime:
+            print(f"{pdf_path} changed since last checkpoint, starting over.")
+            return None
+        return checkpoint
+
+    def _save_checkpoint(self, pdf_path, checkpoint, jurisdiction=None):
+        path = self._checkpoint_path(pdf_path, jurisdiction)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stat = os.stat(pdf_path)
+        checkpoint.update({"source": pdf_path, "size": stat.st_size, "mtime": stat.st_mtime})
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, path)
+
+    def _ingest_pdf_streaming(self, pdf_path, window_size, jurisdiction=None):
+        checkpoint = self._load_checkpoint(pdf_path, jurisdiction)
+        if checkpoint and checkpoint.get("complete"):
+            print(f"{pdf_path} already ingested ({checkpoint['chunks_added']} chunks), skipping.")
+            return
+
+        resumed = checkpoint is not None
+        if resumed:
+            # Last committed (page, section); everything up to it is already stored
+            last_committed = tuple(checkpoint["last_committed"])
+            chunks_added = checkpoint["chunks_added"]
+            print(f"Resuming {pdf_path} after page {last_committed[0]} section {last_committed[1]} "
+                  f"({chunks_added} chunks already added)...")
+        else:
+            last_committed = (-1, -1)
+            chunks_added = 0
+            print(f"Streaming ingest of {pdf_path} (window={window_size})...")
+
+        text_chunks, metadatas, ids = [], [], []
+        position = last_committed
+        chunks = self._iter_chunks(pdf_path, start_page=max(last_committed[0], 0), jurisdiction=jurisdiction)
+        for page, section, chunk_id, text, metadata in chunks:
+            if (page, section) <= last_committed:
+                continue
+            text_chunks.append(text)
+            metadatas.append(metadata)
+            ids.append(chunk_id)
+            position = (page, section)
+
+            if len(ids) >= window_size:
+                self._commit_chunks(text_chunks, metadatas, ids)
+                chunks_added += len(ids)
+                self._save_checkpoint(pdf_path, {"last_committed": position, "chunks_added": chunks_added}, jurisdiction)
+                text_chunks, metadatas, ids = [], [], []
+
+        if ids:
+            self._commit_chunks(text_chunks, metadatas, ids)
+            chunks_added += len(ids)
+
+        if resumed:
+            # The interrupted run committed windows to the vector store whose lexical
+            # entries were never saved; rebuild from the store to close the gap.
+            self._rebuild_lexical_index()
+        else:
+            self.lexical_index.save()
+        self._save_checkpoint(pdf_path, {"last_committed": position, "chunks_added": chunks_added, "complete": True},
+                              jurisdiction)
+        print(f"Added {chunks_added} chunks to the vector store.")
+
+    def query(self, query_text, n_results=3, mode="vector"):
+        """
+        Retrieves the chunks most relevant to query_text.
+
+        Args:
+            query_text (str): The natural language or exact-term query.
+            n_results (int): Number of chunks to return.
+            mode (str): "vector" (embeddings), "lexical" (BM25) or "hybrid" (rank fusion of both).
+
+        Returns:
+            dict: Chroma-style result ({'ids', 'documents', 'metadatas', 'distances'})
+                  plus 'mode' and 'latency_ms'.
+        """
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {mode}. Expected one of {RETRIEVAL_MODES}")
+
+        start = time.perf_counter()
+        if mode == "vector":
+            results = self._vector_query(query_text, n_results)
+        elif mode == "lexical":
+            results = self._lexical_query(query_text, n_results)
+        else:
+            results = self._hybrid_query(query_text, n_results)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        self.latencies_ms[mode].append(latency_ms)
+        results["mode"] = mode
+        results["latency_ms"] = latency_ms
+        return results
+
+    def _vector_query(self, query_text, n_results):
+        return self.store.query(
             query_texts=[query_text],
             n_results=n_results
         )
+
+    def _lexical_query(self, query_text, n_results):
+        ranked = self.lexical_index.search(query_text, n_results)
+        return self._format_results(ranked)
+
+    def _hybrid_query(self, query_text, n_results):
+        # Fetch a deeper candidate list from each retriever, then fuse by rank
+        depth = n_results * 3
+        vector_results = self._vector_query(query_text, depth)
+        vector_ids = vector_results["ids"][0]
+        lexical_ids = [doc_id for doc_id, _ in self.lexical_index.search(query_text, depth)]
+
+        fused = {}
+        for ranking in (vector_ids, lexical_ids):
+            for rank, doc_id in enumerate(ranking):
+                fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:n_results]
+        results = self._format_results(ranked)
+        if "timed_out_shards" in vector_results:
+            results["timed_out_shards"] = vector_results["timed_out_shards"]
         return results
 
+    def _format_results(self, ranked):
+        """Shapes [(chunk_id, score), ...] like a Chroma query result (higher score = closer)."""
+        ids = [doc_id for doc_id, _ in ranked]
+        missing = [doc_id for doc_id in ids if doc_id not in self.lexical_index.documents]
+        if missing:
+            # Chunks the lexical index has not seen yet; resolve them from the vector store
+            fetched = self.store.get(ids=missing, include=["documents", "metadatas"])
+            self.lexical_index.add(fetched["documents"], fetched["metadatas"], fetched["ids"])
+
+        return {
+            "ids": [ids],
+            "documents": [[self.lexical_index.documents[doc_id] for doc_id in ids]],
+            "metadatas": [[self.lexical_index.metadatas[doc_id] for doc_id in ids]],
+            "distances": [[-score for _, score in ranked]]
+        }
+
+    def embedding_throughput(self):
+        """
+        Returns:
+            dict: Sentences embedded, seconds spent and sentences/second, or None if
+                  the embedding backend does not track throughput.
+        """
+        if hasattr(self.embedding_fn, "throughput"):
+            return self.embedding_fn.throughput()
+        return None
+
+    def latency_report(self):
+        """
+        Summarizes query latency per retrieval mode.
+
+        Returns:
+            dict: {mode: {'count', 'avg_ms', 'p50_ms', 'p95_ms'}} for modes that have been used.
+        """
+        report = {}
+        for mode, samples in self.latencies_ms.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            report[mode] = {
+                "count": len(ordered),
+                "avg_ms": sum(ordered) / len(ordered),
+                "p50_ms": ordered[len(ordered) // 2],
+                "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            }
+        return report
+
 if __name__ == "__main__":
     # Test run
     lib = Librarian()
@@ -69,3 +393,9 @@ if __name__ == "__main__":
     results = lib.query("What is the max temperature for Type B(U) packages?")
     print("\nQuery Result:")
     print(results['documents'][0])
+
+    for mode in ("lexical", "hybrid"):
+        results = lib.query("Type B(U) Bq/cm2", mode=mode)
+        print(f"\n{mode} result ({results['latency_ms']:.2f} ms):")
+        print(results['documents'][0])
+    print(f"\nLatency report: {lib.latency_report()}")
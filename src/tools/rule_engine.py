@@ -0,0 +1,202 @@
+import os
+import glob
+import yaml
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class RuleTable:
+    """One versioned rule table (see config/rules/*.yaml for the format)."""
+
+    def __init__(self, spec):
+        self.name = spec["name"]
+        self.version = spec["version"]
+        self.source = spec.get("source")
+        self.applies_to = {k: list(v) for k, v in (spec.get("applies_to") or {}).items()}
+        self.descriptive_fields = set(spec.get("descriptive_fields") or [])
+        self.rules = spec.get("rules") or []
+
+    @property
+    def label(self):
+        return f"{self.name}@v{self.version}"
+
+    def applies(self, scenario):
+        return all(scenario.get(field) in allowed for field, allowed in self.applies_to.items())
+
+    def _limit(self, rule, scenario):
+        """
+        Resolves the limit a rule applies to this scenario.
+
+        Returns:
+            tuple: (kind, limit, context) with kind "max"/"min", or None when the
+                   scenario falls outside what the rule tabulates.
+        """
+        context = {}
+        if "bands" in rule:
+            band_value = scenario.get(rule["band_field"])
+            if not _is_number(band_value):
+                return None
+            band = next((b for b in rule["bands"] if band_value < b["below"]), None)
+            if band is None:
+                return None
+            context["band_value"] = band_value
+            spec = band
+        elif "categories" in rule:
+            category = scenario.get(rule["category_field"])
+            if category not in rule["categories"]:
+                return None
+            context["category"] = category
+            spec = rule["categories"][category]
+        else:
+            spec = rule
+
+        kind = "max" if "max" in spec else "min"
+        limit = spec[kind]
+        override = rule.get("limit_override_field")
+        if override and override in scenario:
+            if not _is_number(scenario[override]):
+                return None
+            limit = scenario[override]
+        return kind, limit, context
+
+    @property
+    def fields(self):
+        """Every scenario field this table reads or treats as descriptive."""
+        fields = set(self.descriptive_fields) | set(self.applies_to)
+        for rule in self.rules:
+            fields.update(rule.get("when") or {})
+            fields.update(f for f in (rule["field"], rule.get("band_field"), rule.get("category_field"),
+                                      rule.get("limit_override_field")) if f)
+        return fields
+
+    def margins(self, scenario):
+        """
+        Relative distance of each checkable value from its limit, |value - limit| / |limit|
+        (0 = exactly on the threshold). Unlike evaluate(), works on partially covered scenarios.
+
+        Returns:
+            dict: rule id -> margin
+        """
+        margins = {}
+        for rule in self.rules:
+            when = rule.get("when") or {}
+            if any(scenario.get(k) != v for k, v in when.items()):
+                continue
+            value = scenario.get(rule["field"])
+            resolved = self._limit(rule, scenario) if _is_number(value) else None
+            if resolved is None:
+                continue
+            limit = resolved[1]
+            margins[rule["id"]] = abs(value - limit) / max(abs(limit), 1e-9)
+        return margins
+
+    def evaluate(self, scenario):
+        """
+        Returns:
+            dict: Decision with per-rule outcomes, or None if the scenario is not fully covered.
+        """
+        covered = set(self.descriptive_fields)
+        outcomes = []
+
+        for rule in self.rules:
+            when = rule.get("when") or {}
+            if any(scenario.get(k) != v for k, v in when.items()):
+                continue
+
+            selector = rule.get("band_field") or rule.get("category_field")
+            if rule["field"] not in scenario:
+                # Nothing to check, but a selector inside the table is understood
+                if selector and selector in scenario:
+                    if self._limit(rule, scenario) is None:
+                        return None
+                    covered.add(selector)
+                continue
+
+            value = scenario[rule["field"]]
+            resolved = self._limit(rule, scenario)
+            if resolved is None or not _is_number(value):
+                return None
+            kind, limit, context = resolved
+
+            passed = value <= limit if kind == "max" else value >= limit
+            covered.add(rule["field"])
+            covered.update(f for f in (selector, rule.get("limit_override_field")) if f and f in scenario)
+            outcomes.append({
+                "rule": rule["id"],
+                "section": rule.get("section"),
+                "passed": passed,
+                "value": value,
+                "limit": limit,
+                "reason": None if passed else rule["reason"].format(value=value, limit=limit, **context)
+            })
+
+        # Any field no rule understood means the LLM has to reason about it
+        if not outcomes or any(field not in covered for field in scenario):
+            return None
+
+        failures = [o["reason"] for o in outcomes if not o["passed"]]
+        if failures:
+            reason = "; ".join(failures)
+        else:
+            reason = "All applicable rules satisfied: " + ", ".join(
+                f"{o['rule']} (Sec. {o['section']})" for o in outcomes
+            )
+        return {
+            "compliant": not failures,
+            "reason": reason,
+            "rule_table": self.label,
+            "rules": outcomes
+        }
+
+
+class RuleEngine:
+    """
+    Deterministic fast path in front of LLM code-as-policy.
+
+    Loads every rule table in rules_dir (keeping the highest version per table
+    name) and evaluates scenarios directly. evaluate() only answers when a table
+    fully covers the scenario: every field is either descriptive or consumed by
+    an applicable rule, and at least one rule was evaluated. Anything else
+    returns None and goes to the LLM path.
+    """
+
+    def __init__(self, rules_dir="config/rules"):
+        self.rules_dir = rules_dir
+        self.tables = {}
+
+        for path in sorted(glob.glob(os.path.join(rules_dir, "*.yaml"))):
+            with open(path, 'r') as f:
+                table = RuleTable(yaml.safe_load(f))
+            current = self.tables.get(table.name)
+            if current is None or table.version > current.version:
+                self.tables[table.name] = table
+
+    @property
+    def versions(self):
+        return {name: table.version for name, table in self.tables.items()}
+
+    @property
+    def material_classes(self):
+        return {c for table in self.tables.values() for c in table.applies_to.get("material_class", [])}
+
+    @property
+    def fields(self):
+        return set().union(*(table.fields for table in self.tables.values()))
+
+    def margins(self, scenario):
+        """Threshold margins (see RuleTable.margins) from every table that applies to the scenario."""
+        margins = {}
+        for table in self.tables.values():
+            if table.applies(scenario):
+                margins.update({f"{table.label}:{rule}": m for rule, m in table.margins(scenario).items()})
+        return margins
+
+    def evaluate(self, scenario):
+        for table in self.tables.values():
+            if table.applies(scenario):
+                decision = table.evaluate(scenario)
+                if decision is not None:
+                    return decision
+        return None
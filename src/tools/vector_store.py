@@ -0,0 +1,558 @@
+import os
+import re
+import json
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, wait
+import numpy as np
+import chromadb
+
+# Vector store backends selectable through Librarian(vector_backend=...)
+VECTOR_BACKENDS = ("chroma", "numpy")
+
+# Storage dtypes supported by NumpyVectorStore
+NUMPY_DTYPES = ("float32", "float16", "int8")
+
+# HNSW parameters accepted in hnsw_config, mapped to Chroma's configuration keys.
+# M and ef_construction are fixed when the collection is created; ef_search can change at any time.
+HNSW_PARAMS = {"M": "max_neighbors", "ef_construction": "ef_construction", "ef_search": "ef_search"}
+
+# Metadata fields ShardedVectorStore can partition on
+SHARD_KEYS = ("jurisdiction", "source")
+
+
+class VectorStore:
+    """
+    Interface Librarian relies on. It mirrors the subset of the Chroma
+    collection API we use, so results keep the same shape for every backend:
+    query results are {'ids', 'documents', 'metadatas', 'distances'}, each a
+    list with one entry per query.
+    """
+
+    def add(self, documents, metadatas, ids):
+        raise NotImplementedError
+
+    def query(self, query_texts=None, n_results=3, query_embeddings=None):
+        raise NotImplementedError
+
+    def get(self, ids=None, include=None):
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Loads on-disk index structures so the first real query is not slowed by I/O."""
+        pass
+
+
+class ChromaVectorStore(VectorStore):
+    """Default backend: a persistent ChromaDB collection (HNSW index + SQLite)."""
+
+    def __init__(self, db_path, embedding_fn, collection_name="hazmat_regulations", hnsw_config=None):
+        # We embed documents and queries ourselves rather than registering the
+        # function with Chroma: Chroma pins the embedding function name in the
+        # collection config, which would stop a collection built with
+        # sentence-transformers from being queried through the onnx backends
+        # (same model, same vectors).
+        self.embedding_fn = embedding_fn
+        self.client = chromadb.PersistentClient(path=db_path)
+
+        hnsw_config = hnsw_config or {}
+        unknown = set(hnsw_config) - set(HNSW_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown HNSW parameters: {sorted(unknown)}. Expected {sorted(HNSW_PARAMS)}")
+        hnsw = {HNSW_PARAMS[key]: value for key, value in hnsw_config.items()}
+
+        # Always cosine, like the shipped collection and NumpyVectorStore; Chroma's default
+        # is l2 now that no embedding function is registered to imply a space
+        self.collection = self.client.get_or_create_collection(
+            name=collection_name,
+            embedding_function=None,
+            configuration={"hnsw": dict(hnsw, space="cosine")}
+        )
+
+        # get_or_create ignores the configuration for an existing collection
+        space = self._raw_hnsw_config().get("space")
+        if space not in (None, "cosine"):
+            print(f"Collection {collection_name} was built with space={space}; rebuild it for cosine distances.")
+        current = self.hnsw_settings()
+        for key in ("M", "ef_construction"):
+            wanted = hnsw_config.get(key)
+            if wanted is not None and current.get(key) != wanted:
+                print(f"Collection {collection_name} was built with {key}={current.get(key)}; "
+                      f"{key}={wanted} only applies to a rebuilt collection.")
+        if hnsw_config.get("ef_search") is not None and current.get("ef_search") != hnsw_config["ef_search"]:
+            self.set_ef_search(hnsw_config["ef_search"])
+
+    def hnsw_settings(self):
+        """
+        Returns:
+            dict: {'M', 'ef_construction', 'ef_search'} currently in effect for the collection.
+        """
+        hnsw = self._raw_hnsw_config()
+        return {key: hnsw.get(chroma_key) for key, chroma_key in HNSW_PARAMS.items()}
+
+    def _raw_hnsw_config(self):
+        # Read the raw JSON: .configuration would try to rebuild the persisted embedding function
+        config = self.collection.configuration_json or {}
+        return config.get("hnsw") or (config.get("vector_index") or {}).get("hnsw") or {}
+
+    def set_ef_search(self, ef_search):
+        """Changes the query-time candidate list size (higher = better recall, slower)."""
+        self.collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
+
+    def add(self, documents, metadatas, ids):
+        self.collection.add(
+            documents=documents,
+            embeddings=self.embedding_fn(documents),
+            metadatas=metadatas,
+            ids=ids
+        )
+
+    def query(self, query_texts=None, n_results=3, query_embeddings=None):
+        if query_embeddings is None:
+            query_embeddings = self.embedding_fn(query_texts)
+        return dict(self.collection.query(query_embeddings=query_embeddings, n_results=n_results))
+
+    def get(self, ids=None, include=None):
+        return self.collection.get(ids=ids, include=include or ["documents", "metadatas"])
+
+    def count(self):
+        return self.collection.count()
+
+    def warm_up(self):
+        # Chroma loads header.bin / link_lists.bin lazily on the first query;
+        # one throwaway query pulls the whole HNSW segment into memory.
+        if self.collection.count() == 0:
+            return
+        sample = self.collection.get(limit=1, include=["embeddings"])["embeddings"]
+        self.collection.query(query_embeddings=[np.asarray(sample[0]).tolist()], n_results=1)
+
+    def recall_latency_report(self, query_embeddings, ef_values=(10, 20, 50, 100, 200), n_results=10):
+        """
+        Measures recall@n_results and mean query latency for several ef_search values,
+        against exact (brute-force) cosine top-k over every stored embedding.
+
+        Returns:
+            list: [{'ef_search', 'recall', 'avg_latency_ms'}, ...] in ef_values order.
+        """
+        stored = self.collection.get(include=["embeddings"])
+        matrix = np.asarray(stored["embeddings"], dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+        k = min(n_results, len(stored["ids"]))
+        exact = [set(stored["ids"][i] for i in np.argsort(-(matrix @ q))[:k]) for q in queries]
+
+        original_ef = self.hnsw_settings()["ef_search"]
+        report = []
+        try:
+            for ef in ef_values:
+                self.set_ef_search(ef)
+                hits = 0
+                start = time.perf_counter()
+                for q, truth in zip(queries, exact):
+                    found = self.collection.query(query_embeddings=[q.tolist()], n_results=k)["ids"][0]
+                    hits += len(truth.intersection(found))
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                report.append({
+                    "ef_search": ef,
+                    "recall": hits / (k * len(exact)) if exact and k else 1.0,
+                    "avg_latency_ms": elapsed_ms / max(len(exact), 1)
+                })
+        finally:
+            if original_ef is not None:
+                self.set_ef_search(original_ef)
+        return report
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Brute-force backend for small corpora (thousands of chunks).
+
+    Embeddings are L2-normalized and stored as one contiguous matrix on disk,
+    memory-mapped on load. A query batch is answered with a single matrix
+    product followed by argpartition for top-k. int8 storage uses symmetric
+    per-row scales, float16 halves memory with negligible recall loss.
+
+    The matrix file is preallocated with spare rows: add() writes only the new
+    window's rows into it, and an added id that already exists gets a fresh row
+    rather than being overwritten in place. records.json (ids, documents,
+    metadatas, the row of each id and the matrix file in use) is the commit
+    point and is replaced atomically, so a crash mid-add leaves the previous
+    state. When the matrix is full it is rebuilt into a new file with only the
+    live rows and twice the room.
+    """
+
+    # Rows scored per block so int8/float16 matrices are never fully upcast at once
+    BLOCK_ROWS = 65536
+
+    # Rows preallocated for a new matrix file
+    MIN_CAPACITY = 1024
+
+    def __init__(self, db_path, embedding_fn, collection_name="hazmat_regulations", dtype="float32"):
+        if dtype not in NUMPY_DTYPES:
+            raise ValueError(f"Unknown dtype: {dtype}. Expected one of {NUMPY_DTYPES}")
+
+        self.embedding_fn = embedding_fn
+        self.dtype = dtype
+        self.store_dir = os.path.join(db_path, f"{collection_name}_numpy_{dtype}")
+        self.records_path = os.path.join(self.store_dir, "records.json")
+        os.makedirs(self.store_dir, exist_ok=True)
+
+        self.ids = []
+        self.documents = []
+        self.metadatas = []
+        self.rows = []           # matrix row of each id
+        self.used = 0            # matrix rows written so far, live or superseded
+        self.matrix_file = None  # file names within store_dir
+        self.scales_file = None
+        self.matrix = None
+        self.scales = None
+        self._live = None        # np.array(rows), or None while rows are simply 0..n-1
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.records_path):
+            return
+        with open(self.records_path, 'r') as f:
+            records = json.load(f)
+        self.ids = records["ids"]
+        self.documents = records["documents"]
+        self.metadatas = records["metadatas"]
+        # Stores written before rows/used were recorded hold exactly one row per id
+        self.rows = records.get("rows", list(range(len(self.ids))))
+        self.used = records.get("used", len(self.ids))
+        self.matrix_file = records.get("matrix_file", "embeddings.npy")
+        self.matrix = np.load(os.path.join(self.store_dir, self.matrix_file), mmap_mode='r')
+        if self.dtype == "int8":
+            self.scales_file = records.get("scales_file", "scales.npy")
+            self.scales = np.load(os.path.join(self.store_dir, self.scales_file), mmap_mode='r')
+        self._index_rows()
+
+    def _index_rows(self):
+        self._live = None if self.rows == list(range(len(self.rows))) else np.array(self.rows, dtype=np.int64)
+
+    def _save(self):
+        """Atomically replaces records.json, which commits every row written before it."""
+        records = {
+            "ids": self.ids,
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+            "rows": self.rows,
+            "used": self.used,
+            "matrix_file": self.matrix_file,
+            "scales_file": self.scales_file
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(records, f)
+            os.replace(tmp_path, self.records_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _embed(self, texts):
+        vectors = np.asarray(self.embedding_fn(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _quantize(self, vectors):
+        if self.dtype == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+            return quantized, scales.astype(np.float32)
+        return vectors.astype(self.dtype), None
+
+    def _new_file(self, prefix, shape, dtype, source=None, rows=()):
+        """
+        Writes a new .npy file of `shape` whose first rows are source[rows], and
+        returns its name; nothing refers to it until the next _save().
+        """
+        fd, path = tempfile.mkstemp(dir=self.store_dir, prefix=f"{prefix}.", suffix=".npy")
+        os.close(fd)
+        try:
+            array = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+            for start in range(0, len(rows), self.BLOCK_ROWS):
+                block = rows[start:start + self.BLOCK_ROWS]
+                array[start:start + len(block)] = source[block]
+            array.flush()
+            del array
+        except BaseException:
+            os.remove(path)
+            raise
+        return os.path.basename(path)
+
+    def _rebuild(self, capacity, dim, dtype):
+        """Moves the live rows, in id order, into new files with `capacity` rows."""
+        rows = np.array(self.rows, dtype=np.int64)
+        matrix_file = self._new_file("embeddings", (capacity, dim), dtype, self.matrix, rows)
+        scales_file = None
+        if self.dtype == "int8":
+            scales_file = self._new_file("scales", (capacity,), np.float32, self.scales, rows)
+        self.rows = list(range(len(self.ids)))
+        self.used = len(self.ids)
+        return matrix_file, scales_file
+
+    def add(self, documents, metadatas, ids):
+        if not ids:
+            return
+        vectors, scales = self._quantize(self._embed(documents))
+        stale = []
+
+        # Room for the new rows, rebuilding (compacted, twice the size) when the matrix is full
+        capacity = self.matrix.shape[0] if self.matrix is not None else 0
+        if self.used + len(ids) > capacity:
+            capacity = max(self.MIN_CAPACITY, 2 * (len(self.ids) + len(ids)))
+            matrix_file, scales_file = self._rebuild(capacity, vectors.shape[1], vectors.dtype)
+            stale = [name for name in (self.matrix_file, self.scales_file) if name]
+            self.matrix_file, self.scales_file = matrix_file, scales_file
+
+        # Only this window's rows are written, past every row records.json refers to
+        first = self.used
+        matrix = np.load(os.path.join(self.store_dir, self.matrix_file), mmap_mode='r+')
+        matrix[first:first + len(ids)] = vectors
+        matrix.flush()
+        del matrix
+        if scales is not None:
+            all_scales = np.load(os.path.join(self.store_dir, self.scales_file), mmap_mode='r+')
+            all_scales[first:first + len(ids)] = scales
+            all_scales.flush()
+            del all_scales
+
+        # Existing ids point at their new row, new ids are appended
+        positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        for row, (doc_id, text, metadata) in enumerate(zip(ids, documents, metadatas)):
+            if doc_id in positions:
+                i = positions[doc_id]
+                self.rows[i] = first + row
+                self.documents[i] = text
+                self.metadatas[i] = metadata
+            else:
+                positions[doc_id] = len(self.ids)
+                self.ids.append(doc_id)
+                self.documents.append(text)
+                self.metadatas.append(metadata)
+                self.rows.append(first + row)
+        self.used = first + len(ids)
+        self._save()
+
+        for name in stale:
+            os.remove(os.path.join(self.store_dir, name))
+        self.matrix = np.load(os.path.join(self.store_dir, self.matrix_file), mmap_mode='r')
+        if self.scales_file:
+            self.scales = np.load(os.path.join(self.store_dir, self.scales_file), mmap_mode='r')
+        self._index_rows()
+
+    def _scores(self, query_vectors):
+        """Cosine similarity of every query against every stored id, shape (n_queries, n_ids)."""
+        blocks = []
+        for start in range(0, self.used, self.BLOCK_ROWS):
+            stop = min(start + self.BLOCK_ROWS, self.used)
+            block = np.asarray(self.matrix[start:stop], dtype=np.float32)
+            scores = query_vectors @ block.T
+            if self.scales is not None:
+                scores *= self.scales[start:stop]
+            blocks.append(scores)
+        scores = np.concatenate(blocks, axis=1)
+        # Superseded rows (ids added again) are scored too, then dropped
+        return scores[:, self._live] if self._live is not None else scores[:, :len(self.ids)]
+
+    def query(self, query_texts=None, n_results=3, query_embeddings=None):
+        if query_embeddings is not None:
+            query_vectors = np.asarray(query_embeddings, dtype=np.float32)
+            query_vectors = query_vectors / np.maximum(np.linalg.norm(query_vectors, axis=1, keepdims=True), 1e-12)
+        else:
+            query_vectors = self._embed(query_texts)
+
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if not self.ids:
+            for _ in range(len(query_vectors)):
+                for key in results:
+                    results[key].append([])
+            return results
+
+        scores = self._scores(query_vectors)
+        k = min(n_results, scores.shape[1])
+        # argpartition finds the top-k in O(n); only those k are then sorted
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates])]
+            results["ids"].append([self.ids[i] for i in ordered])
+            results["documents"].append([self.documents[i] for i in ordered])
+            results["metadatas"].append([self.metadatas[i] for i in ordered])
+            # Cosine distance, matching Chroma's "cosine" space
+            results["distances"].append([float(1.0 - scores[row, i]) for i in ordered])
+        return results
+
+    def get(self, ids=None, include=None):
+        if ids is None:
+            indices = range(len(self.ids))
+        else:
+            positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+            indices = [positions[doc_id] for doc_id in ids if doc_id in positions]
+        return {
+            "ids": [self.ids[i] for i in indices],
+            "documents": [self.documents[i] for i in indices],
+            "metadatas": [self.metadatas[i] for i in indices]
+        }
+
+    def count(self):
+        return len(self.ids)
+
+    def warm_up(self):
+        # Touch every page of the memory-mapped matrix so queries never fault to disk
+        if self.matrix is not None:
+            np.asarray(self.matrix[:self.used]).sum()
+
+
+class ShardedVectorStore(VectorStore):
+    """
+    Partitions the corpus into one backend store per shard (jurisdiction or
+    source document) and fans queries out to every shard on a thread pool.
+
+    The query is embedded once and the same vector is sent to each shard.
+    Per-shard results are merged by distance into a global top-k; shards that
+    miss the timeout are skipped and listed under 'timed_out_shards' so one
+    slow shard cannot stall a compliance check.
+    """
+
+    def __init__(self, db_path, embedding_fn, shard_factory, shard_by="source",
+                 collection_name="hazmat_regulations", shard_timeout_s=2.0, max_workers=8):
+        """
+        Args:
+            db_path (str): Directory holding the shard manifest.
+            embedding_fn (callable): Used to embed queries once before fan-out.
+            shard_factory (callable): collection_name -> VectorStore for a single shard.
+            shard_by (str): Metadata field to partition on ("jurisdiction" or "source").
+            shard_timeout_s (float): Max seconds to wait for shard results per query.
+            max_workers (int): Thread pool size for fan-out.
+        """
+        if shard_by not in SHARD_KEYS:
+            raise ValueError(f"Unknown shard key: {shard_by}. Expected one of {SHARD_KEYS}")
+
+        self.embedding_fn = embedding_fn
+        self.shard_factory = shard_factory
+        self.shard_by = shard_by
+        self.collection_name = collection_name
+        self.shard_timeout_s = shard_timeout_s
+        self.manifest_path = os.path.join(db_path, f"{collection_name}_shards.json")
+        # Long-lived pool: a timed-out shard keeps its worker busy, and creating
+        # a pool per query would block on shutdown waiting for it.
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shard")
+
+        self.shards = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as f:
+                for shard in json.load(f)["shards"]:
+                    self._open_shard(shard)
+
+    def _shard_for(self, metadata):
+        if self.shard_by == "source":
+            value = os.path.splitext(os.path.basename(metadata.get("source", "")))[0]
+        else:
+            value = metadata.get("jurisdiction", "")
+        # Chroma collection names allow [a-zA-Z0-9._-], 3-63 chars
+        return re.sub(r"[^a-zA-Z0-9._-]", "_", value or "default")[:40]
+
+    def _open_shard(self, shard):
+        if shard not in self.shards:
+            self.shards[shard] = self.shard_factory(f"{self.collection_name}__{shard}")
+        return self.shards[shard]
+
+    def _save_manifest(self):
+        with open(self.manifest_path, 'w') as f:
+            json.dump({"shard_by": self.shard_by, "shards": sorted(self.shards)}, f)
+
+    def add(self, documents, metadatas, ids):
+        grouped = {}
+        for doc, metadata, doc_id in zip(documents, metadatas, ids):
+            batch = grouped.setdefault(self._shard_for(metadata), ([], [], []))
+            batch[0].append(doc)
+            batch[1].append(metadata)
+            batch[2].append(doc_id)
+
+        new_shard = any(shard not in self.shards for shard in grouped)
+        for shard, (shard_docs, shard_metadatas, shard_ids) in grouped.items():
+            self._open_shard(shard).add(shard_docs, shard_metadatas, shard_ids)
+        if new_shard:
+            self._save_manifest()
+
+    def query(self, query_texts=None, n_results=3, query_embeddings=None):
+        if query_embeddings is None:
+            query_embeddings = [list(map(float, v)) for v in self.embedding_fn(query_texts)]
+
+        futures = {
+            self.executor.submit(store.query, query_embeddings=query_embeddings, n_results=n_results): shard
+            for shard, store in self.shards.items()
+        }
+        done, not_done = wait(futures, timeout=self.shard_timeout_s)
+
+        timed_out = sorted(futures[f] for f in not_done)
+        failed = []
+        per_query = [[] for _ in query_embeddings]
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Shard {futures[future]} query failed: {e}")
+                failed.append(futures[future])
+                continue
+            for q in range(len(query_embeddings)):
+                per_query[q].extend(zip(result["distances"][q], result["ids"][q],
+                                        result["documents"][q], result["metadatas"][q]))
+        if timed_out:
+            print(f"Shards timed out after {self.shard_timeout_s}s: {timed_out}")
+
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": [],
+                   "timed_out_shards": timed_out, "failed_shards": sorted(failed)}
+        for candidates in per_query:
+            top = sorted(candidates, key=lambda c: c[0])[:n_results]
+            results["distances"].append([c[0] for c in top])
+            results["ids"].append([c[1] for c in top])
+            results["documents"].append([c[2] for c in top])
+            results["metadatas"].append([c[3] for c in top])
+        return results
+
+    def get(self, ids=None, include=None):
+        merged = {"ids": [], "documents": [], "metadatas": []}
+        for store in self.shards.values():
+            part = store.get(ids=ids, include=include)
+            for key in merged:
+                merged[key].extend(part[key])
+        return merged
+
+    def count(self):
+        return sum(store.count() for store in self.shards.values())
+
+    def warm_up(self):
+        for future in [self.executor.submit(store.warm_up) for store in self.shards.values()]:
+            future.result()
+
+
+def create_vector_store(backend, db_path, embedding_fn, collection_name="hazmat_regulations", dtype="float32",
+                        hnsw_config=None):
+    """
+    Builds the vector store backend selected by name.
+
+    Args:
+        backend (str): "chroma" (default in Librarian) or "numpy".
+        db_path (str): Directory holding the persisted store.
+        embedding_fn (callable): Chroma-compatible embedding function (list[str] -> list[vector]).
+        collection_name (str): Logical collection name.
+        dtype (str): Storage dtype for the numpy backend ("float32", "float16" or "int8").
+        hnsw_config (dict): HNSW parameters for the chroma backend ("M", "ef_construction", "ef_search").
+    """
+    if backend == "chroma":
+        return ChromaVectorStore(db_path, embedding_fn, collection_name, hnsw_config=hnsw_config)
+    if backend == "numpy":
+        return NumpyVectorStore(db_path, embedding_fn, collection_name, dtype=dtype)
+    raise ValueError(f"Unknown vector backend: {backend}. Expected one of {VECTOR_BACKENDS}")
@@ -0,0 +1,97 @@
+import os
+import json
+import hashlib
+import tempfile
+
+# Key marking a dict as a reference to a stored blob: {"$blob": "sha256:<hex>", "size": <bytes>}
+BLOB_REF_KEY = "$blob"
+
+# Decision provenance fields that are large and repeated across documents
+EVIDENCE_FIELDS = ("agent_card", "rag_context", "generated_code")
+
+
+def is_blob_ref(value):
+    return isinstance(value, dict) and BLOB_REF_KEY in value
+
+
+class BlobStore:
+    """
+    Content-addressed store for large decision evidence.
+
+    Each value is JSON-encoded and written once under root/<2 hex>/<sha256>.json;
+    putting the same content again is a no-op. Documents (workflow state, provenance
+    events) keep only small references, resolved when a reader needs the evidence.
+    """
+
+    def __init__(self, root="data/blobs"):
+        self.root = root
+        self.writes = 0
+        self.deduplicated = 0
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], f"{digest}.json")
+
+    def put(self, value):
+        """
+        Stores value (any JSON-serializable object) and returns its reference.
+        """
+        data = json.dumps(value, sort_keys=True).encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if os.path.exists(path):
+            self.deduplicated += 1
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Unique temp file: concurrent writers of the same content (threads or processes) must not share one
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+            self.writes += 1
+        return {BLOB_REF_KEY: f"sha256:{digest}", "size": len(data)}
+
+    def get(self, ref):
+        """
+        Args:
+            ref (dict | str): A reference returned by put(), or its "sha256:<hex>" / "<hex>" id.
+        """
+        blob_id = ref[BLOB_REF_KEY] if is_blob_ref(ref) else ref
+        digest = blob_id.split(":", 1)[-1]
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            raise ValueError(f"Invalid blob id: {blob_id}")
+        with open(self._path(digest), 'rb') as f:
+            return json.loads(f.read())
+
+    def externalize(self, decision):
+        """
+        Returns a copy of a compliance decision whose provenance evidence fields
+        (EVIDENCE_FIELDS) are replaced by blob references. Other fields are untouched.
+        """
+        provenance = decision.get("provenance") if isinstance(decision, dict) else None
+        if not isinstance(provenance, dict):
+            return decision
+        provenance = dict(provenance)
+        for field in EVIDENCE_FIELDS:
+            if provenance.get(field) is not None and not is_blob_ref(provenance[field]):
+                provenance[field] = self.put(provenance[field])
+        return dict(decision, provenance=provenance)
+
+    def resolve(self, value):
+        """Returns a copy of value with every blob reference (at any depth) replaced by its content."""
+        if is_blob_ref(value):
+            return self.get(value)
+        if isinstance(value, dict):
+            return {k: self.resolve(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.resolve(v) for v in value]
+        return value
+
+    def stats(self):
+        return {"writes": self.writes, "deduplicated": self.deduplicated}
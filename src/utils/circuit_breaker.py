@@ -0,0 +1,119 @@
+import time
+import threading
+from collections import deque
+
+CLOSED = "closed"        # calls flow normally
+OPEN = "open"            # calls are short-circuited until the cooldown ends
+HALF_OPEN = "half_open"  # a limited number of probe calls test for recovery
+
+
+class CircuitOpenError(Exception):
+    """Raised by callers that short-circuit because the breaker is open."""
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker with an error-rate and latency SLO over a sliding window of calls.
+
+    The circuit opens when, over the last `window` calls (and at least `min_calls`),
+    the error rate exceeds max_error_rate or the latency at `latency_percentile`
+    exceeds latency_slo_ms. While open, allow() returns False. After cooldown_s it
+    goes half-open and lets probe_calls calls through: a probe that succeeds within
+    the SLO closes the circuit (with a fresh window), a failed or slow probe reopens it.
+    """
+
+    def __init__(self, name, window=50, min_calls=10, max_error_rate=0.5, latency_slo_ms=10000,
+                 latency_percentile=95, cooldown_s=30, probe_calls=1):
+        self.name = name
+        self.min_calls = min_calls
+        self.max_error_rate = max_error_rate
+        self.latency_slo_ms = latency_slo_ms
+        self.latency_percentile = latency_percentile
+        self.cooldown_s = cooldown_s
+        self.probe_calls = probe_calls
+
+        self._lock = threading.Lock()
+        self.calls = deque(maxlen=window)  # (success, latency_ms)
+        self.state = CLOSED
+        self.opened_at = None
+        self.probes_in_flight = 0
+        self.times_opened = 0
+        self.short_circuited = 0
+
+    def _open(self, why):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.probes_in_flight = 0
+        self.times_opened += 1
+        print(f"[CircuitBreaker:{self.name}] Opened: {why}")
+
+    def allow(self):
+        """Returns True if a call may go through now (counts a probe when half-open)."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown_s:
+                self.state = HALF_OPEN
+                print(f"[CircuitBreaker:{self.name}] Half-open: probing for recovery")
+            if self.state == HALF_OPEN and self.probes_in_flight < self.probe_calls:
+                self.probes_in_flight += 1
+                return True
+            if self.state == CLOSED:
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record(self, success, latency_ms):
+        """Records the outcome of a call that allow() let through."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probes_in_flight = max(0, self.probes_in_flight - 1)
+                if success and latency_ms <= self.latency_slo_ms:
+                    self.state = CLOSED
+                    self.calls.clear()
+                    print(f"[CircuitBreaker:{self.name}] Closed: probe succeeded in {latency_ms:.0f} ms")
+                else:
+                    self._open("probe failed" if not success else f"probe took {latency_ms:.0f} ms")
+                return
+            if self.state == OPEN:
+                return  # Late result from before the circuit opened
+
+            self.calls.append((success, latency_ms))
+            if len(self.calls) < self.min_calls:
+                return
+            error_rate = sum(1 for ok, _ in self.calls if not ok) / len(self.calls)
+            latency = percentile([ms for _, ms in self.calls], self.latency_percentile)
+            if error_rate > self.max_error_rate:
+                self._open(f"error rate {error_rate:.0%} > {self.max_error_rate:.0%}")
+            elif latency > self.latency_slo_ms:
+                self._open(f"p{self.latency_percentile} latency {latency:.0f} ms > {self.latency_slo_ms} ms")
+
+    def release(self):
+        """
+        Gives back the probe slot of a call that allow() let through but that ended
+        without an outcome (cancelled or interrupted); nothing is recorded.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probes_in_flight = max(0, self.probes_in_flight - 1)
+
+    def stats(self):
+        with self._lock:
+            latencies = [ms for _, ms in self.calls]
+            errors = sum(1 for ok, _ in self.calls if not ok)
+            return {
+                "state": self.state,
+                "window_calls": len(self.calls),
+                "error_rate": errors / len(self.calls) if self.calls else 0.0,
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+                "times_opened": self.times_opened,
+                "short_circuited": self.short_circuited
+            }
@@ -0,0 +1,102 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+
+# Integers beyond this are kept as ints: as floats they would merge distinct values (IDs, activities)
+EXACT_FLOAT_INT = 2 ** 53
+
+
+def _canonical_value(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, int):
+        # 45 and 45.0 decide identically; large ints keep every digit
+        return float(value) if abs(value) <= EXACT_FLOAT_INT else value
+    if isinstance(value, dict):
+        return canonicalize(value)
+    if isinstance(value, (list, tuple)):
+        return [_canonical_value(v) for v in value]
+    return value
+
+
+def canonicalize(scenario):
+    """
+    Canonical form of a scenario for memoization. Lossless only: the key must not merge
+    scenarios the pipeline can decide differently, so there is no unit folding, rounding
+    or string normalization; ints and equal floats share a form. Keys are sorted when
+    the result is serialized.
+    """
+    return {field: _canonical_value(value) for field, value in scenario.items()}
+
+
+class DecisionCache:
+    """
+    Persistent memo of full compliance decisions, keyed by the canonical scenario
+    plus the regulation corpus version and the policy version.
+
+    One JSON file per decision under cache_dir (so separate processes, e.g. the
+    per-request agents of the web app, share it). Entries older than ttl_seconds
+    are treated as misses and removed.
+    """
+
+    def __init__(self, cache_dir="data/decision_cache", ttl_seconds=3600):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    @staticmethod
+    def make_key(scenario_data, corpus_version, policy_version):
+        canonical = json.dumps(canonicalize(scenario_data), sort_keys=True, separators=(",", ":"))
+        raw = f"{canonical}|{corpus_version}|{policy_version}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """
+        Returns:
+            dict: The memoized decision, or None on a miss or expired entry.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        if time.time() - entry["created_at"] > self.ttl_seconds:
+            self.expired += 1
+            self.misses += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # Another process already removed it
+            return None
+
+        self.hits += 1
+        return entry["decision"]
+
+    def put(self, key, decision):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique temp file: concurrent writers of the same key (threads or processes) must not share one
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({"created_at": time.time(), "decision": decision}, f, default=str)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "expired": self.expired}
@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+
+# off:     no caching, every call goes to Gemini
+# auto:    serve cached responses, call Gemini (and record) on a miss
+# record:  always call Gemini and overwrite the cached response
+# replay:  never call Gemini; a miss raises LLMCacheMiss (offline / deterministic runs)
+LLM_CACHE_MODES = ("off", "auto", "record", "replay")
+
+# Selects the mode when agents are not given one explicitly
+LLM_CACHE_MODE_ENV = "HAZARDSAFE_LLM_CACHE_MODE"
+
+
+class LLMCacheMiss(Exception):
+    """Raised in replay mode when no recorded response exists for a request."""
+
+
+class CachedResponse:
+    """Minimal stand-in for a Gemini response: callers only read .text."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+def resolve_cache_mode(mode=None):
+    mode = mode or os.getenv(LLM_CACHE_MODE_ENV, "off")
+    if mode not in LLM_CACHE_MODES:
+        raise ValueError(f"Unknown LLM cache mode: {mode}. Expected one of {LLM_CACHE_MODES}")
+    return mode
+
+
+def _config_to_dict(generation_config):
+    if generation_config is None:
+        return {}
+    if isinstance(generation_config, dict):
+        return generation_config
+    return {k: v for k, v in vars(generation_config).items() if v is not None}
+
+
+class CachedGenerativeModel:
+    """
+    Transport-level cache in front of genai.GenerativeModel.generate_content.
+
+    Responses are stored one JSON file per request under cache_dir, keyed by
+    (model name, prompt hash, generation config, streamed or not). In replay mode
+    the wrapped model may be None, so the real code path runs without network or
+    API key.
+    """
+
+    def __init__(self, model_name, model=None, mode=None, cache_dir="data/llm_cache"):
+        self.model_name = model_name
+        self.model = model
+        self.mode = resolve_cache_mode(mode)
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+        if self.mode != "replay" and self.model is None:
+            raise ValueError(f"LLM cache mode '{self.mode}' needs a live model; only 'replay' works offline.")
+
+    def _key(self, prompt, generation_config, stream=False):
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        config = json.dumps(_config_to_dict(generation_config), sort_keys=True, default=str)
+        # Streams may be cut short by the caller, so their text never answers a generate_content call
+        raw = f"{self.model_name}|{prompt_hash}|{config}" + ("|stream" if stream else "")
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest(), prompt_hash
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _read(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)["text"]
+
+    def _write(self, key, prompt_hash, prompt, generation_config, text, stopped_early=False):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique temp file: concurrent recordings of the same request must not share one
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({
+                    "model": self.model_name,
+                    "prompt_sha256": prompt_hash,
+                    "generation_config": _config_to_dict(generation_config),
+                    "prompt": prompt,
+                    "text": text,
+                    "stopped_early": stopped_early,
+                    "recorded_at": int(time.time())
+                }, f, indent=2, default=str)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _lookup(self, key, prompt_hash):
+        """Returns the recorded response when the mode serves from cache, else None."""
+        if self.mode not in ("auto", "replay"):
+            return None
+        text = self._read(key)
+        if text is not None:
+            self.hits += 1
+            return CachedResponse(text)
+        self.misses += 1
+        if self.mode == "replay":
+            raise LLMCacheMiss(f"No recorded response for {self.model_name} prompt {prompt_hash[:12]}")
+        return None
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        if self.mode == "off":
+            return self.model.generate_content(prompt, generation_config=generation_config, **kwargs)
+
+        key, prompt_hash = self._key(prompt, generation_config)
+        cached = self._lookup(key, prompt_hash)
+        if cached is not None:
+            return cached
+
+        response = self.model.generate_content(prompt, generation_config=generation_config, **kwargs)
+        self._write(key, prompt_hash, prompt, generation_config, response.text)
+        return response
+
+    async def generate_content_async(self, prompt, generation_config=None, **kwargs):
+        if self.mode == "off":
+            return await self.model.generate_content_async(prompt, generation_config=generation_config, **kwargs)
+
+        key, prompt_hash = self._key(prompt, generation_config)
+        cached = self._lookup(key, prompt_hash)
+        if cached is not None:
+            return cached
+
+        response = await self.model.generate_content_async(prompt, generation_config=generation_config, **kwargs)
+        self._write(key, prompt_hash, prompt, generation_config, response.text)
+        return response
+
+    def stream_content(self, prompt, generation_config=None, **kwargs):
+        """
+        Yields the response text chunk by chunk (a cached response is one chunk).
+        Closing the generator early abandons the rest of the generation; the text
+        consumed up to that point is what gets recorded. Streams are recorded under
+        their own key, so a cut-short text is only ever replayed to stream_content.
+        """
+        key, prompt_hash = self._key(prompt, generation_config, stream=True)
+        if self.mode != "off":
+            cached = self._lookup(key, prompt_hash)
+            if cached is not None:
+                yield cached.text
+                return
+
+        chunks = []
+        finished = stopped_early = False
+        try:
+            for chunk in self.model.generate_content(prompt, generation_config=generation_config, stream=True, **kwargs):
+                chunks.append(chunk.text)
+                yield chunk.text
+            finished = True
+        except GeneratorExit:
+            finished = stopped_early = True  # The caller has everything it needs
+            raise
+        finally:
+            if finished and self.mode != "off":
+                self._write(key, prompt_hash, prompt, generation_config, "".join(chunks), stopped_early)
+
+    async def stream_content_async(self, prompt, generation_config=None, **kwargs):
+        """Async variant of stream_content."""
+        key, prompt_hash = self._key(prompt, generation_config, stream=True)
+        if self.mode != "off":
+            cached = self._lookup(key, prompt_hash)
+            if cached is not None:
+                yield cached.text
+                return
+
+        chunks = []
+        finished = stopped_early = False
+        try:
+            response = await self.model.generate_content_async(prompt, generation_config=generation_config,
+                                                                stream=True, **kwargs)
+            async for chunk in response:
+                chunks.append(chunk.text)
+                yield chunk.text
+            finished = True
+        except GeneratorExit:
+            finished = stopped_early = True
+            raise
+        finally:
+            if finished and self.mode != "off":
+                self._write(key, prompt_hash, prompt, generation_config, "".join(chunks), stopped_early)
+
+    def stats(self):
+        return {"mode": self.mode, "hits": self.hits, "misses": self.misses}
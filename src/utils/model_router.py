@@ -0,0 +1,94 @@
+# Fields every scenario should carry; a missing one makes the case harder to judge
+REQUIRED_FIELDS = ("material_class", "package_type")
+
+# Difficulty contributions (the total is capped at 1.0)
+NOVEL_CLASS_WEIGHT = 0.5      # material class no rule table or known list covers
+MISSING_FIELD_WEIGHT = 0.25   # per missing / empty required field
+UNKNOWN_FIELD_WEIGHT = 0.15   # per field no rule table reads
+BORDERLINE_WEIGHT = 0.6       # value sitting exactly on a regulatory threshold
+
+
+class ModelRouter:
+    """
+    Model cascade: scores how hard a scenario is and picks the model tier for it.
+
+    Difficulty (0 = clear-cut, 1 = hard) adds up:
+      - novel material class: not covered by any rule table or known_classes
+      - missing required fields (REQUIRED_FIELDS absent, None or empty)
+      - unknown fields: fields no rule table understands, left to the LLM to interpret
+      - threshold distance: the closest value to a regulatory limit (RuleEngine.margins)
+        contributes linearly once it is within borderline_margin of the limit
+
+    Scenarios below difficulty_threshold go to fast_model, the rest to strong_model.
+    Scenarios the rule engine fully covers never reach the router.
+    """
+
+    def __init__(self, strong_model, fast_model=None, rule_engine=None, difficulty_threshold=0.5,
+                 borderline_margin=0.1, known_classes=()):
+        """
+        Args:
+            strong_model (str): Model for borderline / unfamiliar scenarios.
+            fast_model (str): Cheaper model for clear-cut scenarios (None = always strong_model).
+            rule_engine (RuleEngine): Source of thresholds, known classes and known fields.
+            difficulty_threshold (float): Scores at or above this go to strong_model.
+            borderline_margin (float): Relative distance from a limit that counts as borderline.
+            known_classes (iterable): Extra material classes to treat as familiar.
+        """
+        self.strong_model = strong_model
+        self.fast_model = fast_model
+        self.rule_engine = rule_engine
+        self.difficulty_threshold = difficulty_threshold
+        self.borderline_margin = borderline_margin
+        self.known_classes = set(known_classes)
+        self.known_fields = set(REQUIRED_FIELDS)
+        if rule_engine is not None:
+            self.known_classes |= rule_engine.material_classes
+            self.known_fields |= rule_engine.fields
+
+        self.routed = {"fast": 0, "strong": 0}
+
+    def score(self, scenario):
+        """
+        Returns:
+            tuple: (difficulty, signals) where signals explains the score.
+        """
+        material_class = scenario.get("material_class")
+        novel_class = bool(material_class) and material_class not in self.known_classes
+        missing = [f for f in REQUIRED_FIELDS if scenario.get(f) in (None, "")]
+        unknown = sorted(f for f in scenario if f not in self.known_fields)
+        margins = self.rule_engine.margins(scenario) if self.rule_engine is not None else {}
+        nearest = min(margins.values()) if margins else None
+
+        difficulty = 0.0
+        if novel_class:
+            difficulty += NOVEL_CLASS_WEIGHT
+        difficulty += MISSING_FIELD_WEIGHT * len(missing)
+        difficulty += UNKNOWN_FIELD_WEIGHT * len(unknown)
+        if nearest is not None and nearest < self.borderline_margin:
+            difficulty += BORDERLINE_WEIGHT * (1 - nearest / self.borderline_margin)
+
+        signals = {
+            "novel_class": novel_class,
+            "missing_fields": missing,
+            "unknown_fields": unknown,
+            "nearest_threshold_margin": nearest
+        }
+        return min(1.0, difficulty), signals
+
+    def route(self, scenario):
+        """
+        Returns:
+            dict: {'tier', 'model', 'difficulty', 'signals'}; recorded in decision provenance.
+        """
+        difficulty, signals = self.score(scenario)
+        tier = "fast" if self.fast_model and difficulty < self.difficulty_threshold else "strong"
+        self.routed[tier] += 1
+        return {
+            "tier": tier,
+            "model": self.fast_model if tier == "fast" else self.strong_model,
+            "difficulty": round(difficulty, 3),
+            "signals": signals
+        }
+
+    def stats(self):
+        return dict(self.routed)
@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import base64
+import marshal
+import hashlib
+import tempfile
+import threading
+import importlib.util
+
+# Compiled code objects are only valid for the interpreter that produced them
+BYTECODE_TAG = importlib.util.MAGIC_NUMBER.hex()
+
+
+class PolicyCache:
+    """
+    Persistent cache of generated validator policies.
+
+    Keyed by (regulation context hash, scenario key set, model name, prompt version):
+    the same regulations, the same scenario shape and the same prompt yield the
+    same policy, so a hit skips the LLM call entirely. Each entry stores the
+    source and its marshalled code object; entries written under another prompt
+    version are dropped on load.
+
+    The file is a JSON-lines log: put() appends one entry (last one per key wins),
+    and the log is only rewritten on load when it holds stale or duplicate entries.
+    Safe to share between threads.
+    """
+
+    def __init__(self, prompt_version, cache_path="data/policy_cache.json"):
+        self.prompt_version = prompt_version
+        self.cache_path = cache_path
+        self.entries = {}
+        self.compiled = {}  # key -> code object, filled lazily
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.exists(self.cache_path):
+            self._load()
+
+    @staticmethod
+    def make_key(context_text, scenario_data, model_name, prompt_version):
+        context_hash = hashlib.sha256(context_text.encode("utf-8")).hexdigest()
+        key_set = ",".join(sorted(scenario_data.keys()))
+        raw = f"{context_hash}|{key_set}|{model_name}|{prompt_version}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _read_entries(self):
+        """Returns (entries, records read); reads the log or a single-object file from older versions."""
+        with open(self.cache_path, 'r') as f:
+            text = f.read()
+        try:
+            legacy = json.loads(text)
+            if isinstance(legacy, dict) and "key" not in legacy:
+                return legacy, len(legacy) + 1  # {key: entry}; rewritten as a log by _load
+        except ValueError:
+            pass
+        entries = {}
+        records = 0
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            records += 1
+            try:
+                record = json.loads(line)
+                entries[record.pop("key")] = record
+            except (ValueError, KeyError):
+                continue  # e.g. a line cut short by a crash; dropped when compacting
+        return entries, records
+
+    def _load(self):
+        try:
+            entries, records = self._read_entries()
+        except (OSError, ValueError) as e:
+            print(f"[PolicyCache] Could not read {self.cache_path} ({e}). Starting empty.")
+            return
+
+        self.entries = {
+            key: entry for key, entry in entries.items()
+            if entry.get("prompt_version") == self.prompt_version
+        }
+        stale = len(entries) - len(self.entries)
+        if stale:
+            print(f"[PolicyCache] Dropped {stale} policies from older prompt versions.")
+        if records > len(self.entries):
+            self._compact()
+
+    def _compact(self):
+        directory = os.path.dirname(self.cache_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, 'w') as f:
+            for key, entry in self.entries.items():
+                f.write(json.dumps(dict(entry, key=key)) + "\n")
+        os.replace(tmp_path, self.cache_path)
+
+    def _append(self, key, entry):
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One write per line in append mode, so lines from other processes do not interleave
+        with open(self.cache_path, 'a') as f:
+            f.write(json.dumps(dict(entry, key=key)) + "\n")
+
+    def get(self, key):
+        """
+        Returns:
+            tuple: (source, code_object) on a hit, None on a miss.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        if key not in self.compiled:
+            if entry.get("bytecode_tag") == BYTECODE_TAG:
+                self.compiled[key] = marshal.loads(base64.b64decode(entry["bytecode"]))
+            else:
+                # Written by another Python version; recompile from source
+                self.compiled[key] = compile(entry["code"], f"<policy {key[:12]}>", "exec")
+        return entry["code"], self.compiled[key]
+
+    def put(self, key, code, model_name):
+        """
+        Compiles and stores a policy. Raises SyntaxError for code that does not compile,
+        so broken LLM output is never cached.
+        """
+        code_object = compile(code, f"<policy {key[:12]}>", "exec")
+        entry = {
+            "code": code,
+            "bytecode": base64.b64encode(marshal.dumps(code_object)).decode("ascii"),
+            "bytecode_tag": BYTECODE_TAG,
+            "model_name": model_name,
+            "prompt_version": self.prompt_version,
+            "created_at": int(time.time())
+        }
+        with self._lock:
+            self.entries[key] = entry
+            self.compiled[key] = code_object
+            self._append(key, entry)
+        return code_object
+
+    def stats(self):
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
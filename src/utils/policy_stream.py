@@ -0,0 +1,58 @@
+# Line the policy prompt asks the model to end the script with
+END_MARKER = "# END POLICY"
+
+
+class PolicyStream:
+    """
+    Assembles a validator policy from streamed LLM text.
+
+    Markdown fence lines (```python / ```) are dropped as they arrive. The policy
+    ends at END_MARKER or at a closing fence; whatever follows is prose, so the rest
+    of the generation can be abandoned. Without either, the whole stream is the
+    policy. Nothing is inferred from the code itself: a policy that has assigned
+    result and reason may still go on to revise them.
+    """
+
+    def __init__(self, end_marker=END_MARKER):
+        self.end_marker = end_marker
+        self.pending = ""   # current, not yet complete line
+        self.lines = []     # complete code lines, fences removed
+        self.in_fence = False
+        self.ready = False
+        self.stopped_early = False
+
+    def _ends_policy(self, line):
+        stripped = line.strip()
+        if stripped == self.end_marker:
+            return True
+        # Closing fence (an opening one comes before any code)
+        return stripped.startswith("```") and (self.in_fence or any(l.strip() for l in self.lines))
+
+    def feed(self, chunk):
+        """
+        Adds streamed text.
+
+        Returns:
+            bool: True once the policy is complete; stop consuming the stream.
+        """
+        if self.ready:
+            return True
+        self.pending += chunk
+        *complete, self.pending = self.pending.split("\n")
+        for line in complete:
+            if self._ends_policy(line):
+                self.ready = self.stopped_early = True
+                return True
+            if line.strip().startswith("```"):
+                self.in_fence = True
+                continue
+            self.lines.append(line)
+        return False
+
+    def text(self):
+        """The policy source: everything up to the end marker or closing fence, or the full stream."""
+        lines = list(self.lines)
+        if not self.stopped_early and self.pending and not self._ends_policy(self.pending) \
+                and not self.pending.strip().startswith("```"):
+            lines.append(self.pending)
+        return "\n".join(lines).strip()
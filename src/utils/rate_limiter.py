@@ -0,0 +1,36 @@
+import time
+import asyncio
+
+
+class AsyncTokenBucket:
+    """
+    Token-bucket rate limiter for asyncio callers.
+
+    Tokens refill continuously at `rate_per_second` up to `capacity`; each
+    acquire() takes one token and waits if none is available. Set the rate to
+    the API quota (e.g. requests per minute / 60) and the capacity to the burst
+    the quota tolerates.
+    """
+
+    def __init__(self, rate_per_second, capacity=None):
+        if rate_per_second <= 0:
+            raise ValueError("rate_per_second must be positive")
+        self.rate = rate_per_second
+        self.capacity = capacity or max(1.0, rate_per_second)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, tokens=1):
+        # The lock makes waiters queue in FIFO order instead of racing for refills
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
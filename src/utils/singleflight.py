@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+
+class _Call:
+    """One in-flight call that concurrent callers with the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Request coalescing: concurrent callers with the same key share one in-flight call.
+
+    The first caller for a key (the leader) runs the function; callers arriving
+    while it is in flight wait and receive the leader's result (or exception)
+    instead of making their own call. Nothing is cached: once the call finishes
+    the key is released, so later callers start a new call.
+
+    Thread-based callers use do(); coroutines use do_async(). Async calls are
+    coalesced per event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}        # key -> _Call
+        self._async_calls = {}  # (loop, key) -> asyncio.Future
+        self.calls = 0          # calls actually executed
+        self.collapsed = 0      # calls served by another caller's in-flight call
+
+    def do(self, key, fn):
+        """
+        Runs fn() unless a call with the same key is already in flight, in which
+        case it waits for that call and returns its result.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.collapsed += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+            return call.value
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, coro_fn):
+        """
+        Awaits coro_fn() unless a call with the same key is already in flight on
+        this event loop, in which case it awaits that call's result.
+        """
+        flight_key = (asyncio.get_running_loop(), key)
+        future = self._async_calls.get(flight_key)
+        if future is not None:
+            self.collapsed += 1
+            # shield: a cancelled follower must not cancel the leader's call
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the exception as retrieved even when no follower awaited it
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._async_calls[flight_key] = future
+        self.calls += 1
+        try:
+            result = await coro_fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._async_calls[flight_key]
+
+    def stats(self):
+        """
+        Returns:
+            dict: {'calls', 'collapsed', 'in_flight'}; collapsed counts the calls saved.
+        """
+        return {
+            "calls": self.calls,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._calls) + len(self._async_calls)
+        }
@@ -83,9 +83,10 @@ def get_pending():
 
 @app.route('/api/workflow/<workflow_id>')
 def get_workflow(workflow_id):
-    """Get details of a specific workflow"""
+    """Get details of a specific workflow (?resolve=evidence inlines decision evidence blobs)"""
     try:
-        workflow = workflow_manager.get_workflow_state(workflow_id)
+        resolve_evidence = request.args.get('resolve') == 'evidence'
+        workflow = workflow_manager.get_workflow_state(workflow_id, resolve_evidence=resolve_evidence)
         if not workflow:
             return jsonify({"success": False, "error": "Workflow not found"}), 404
         
@@ -289,6 +290,14 @@ def get_history():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/blobs/<blob_id>')
+def get_blob(blob_id):
+    """Resolve a decision-evidence blob reference ({"$blob": "sha256:..."})"""
+    try:
+        return jsonify({"success": True, "value": workflow_manager.blobs.get(blob_id)})
+    except (ValueError, OSError) as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+
 @app.route('/api/architecture')
 def get_architecture():
     """Get workflow architecture information"""
@@ -2,6 +2,7 @@ import time
 import yaml
 import os
 from src.utils.firestore_client import FirestoreClient
+from src.utils.blob_store import BlobStore
 
 # Load configuration
 CONFIG_PATH = "config/hitl_config.yaml"
@@ -23,6 +24,9 @@ class WorkflowManager:
     
     def __init__(self):
         self.db = FirestoreClient(collection_name="workflow_state")
+        # Decision evidence (agent card, RAG context, generated code) lives here once;
+        # workflow documents and their history only hold references
+        self.blobs = BlobStore()
         self.config = self._load_config()
 
     def _load_config(self):
@@ -113,7 +117,7 @@ class WorkflowManager:
             decision_data: The AI's decision/recommendation that needs review
         """
         metadata = {
-            "decision_data": decision_data,
+            "decision_data": self.blobs.externalize(decision_data),
             "hitl_triggered_at": int(time.time())
         }
         
@@ -215,9 +219,15 @@ class WorkflowManager:
         
         return timed_out
 
-    def get_workflow_state(self, doc_id):
-        """Get the current state of a workflow"""
-        return self.db.get_document(doc_id)
+    def get_workflow_state(self, doc_id, resolve_evidence=False):
+        """
+        Get the current state of a workflow.
+        Evidence in decision_data stays as blob references unless resolve_evidence is set.
+        """
+        state = self.db.get_document(doc_id)
+        if state and resolve_evidence:
+            return self.blobs.resolve(state)
+        return state
 
     def get_pending_workflows(self):
         """Get all workflows pending human review"""